@@ -0,0 +1 @@
+"""Benchmarks of metadata_validator."""
@@ -0,0 +1,166 @@
+"""Benchmark suite of metadata_validator.
+
+For each spec and size, synthetic valid and invalid workbooks are generated (and
+kept in --data-dir for the next runs), then reading, validating and generating the
+template are timed. Every case runs in a fresh process, so the peak memory (max
+RSS) belongs to the case alone.
+
+Usage::
+
+    python -m benchmarks.run --sizes 1000,100000 --save results.json
+    python -m benchmarks.run --sizes 1000,100000 --compare results.json
+
+With --compare the suite exits with status 1 if a timing is slower than the saved
+one by more than --threshold.
+"""
+import sys
+import json
+import time
+import resource
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from metadata_validator.specs import spec_dict
+from metadata_validator.validator import validator_dict
+
+from tests.synthetic import generate_workbook
+
+DEFAULT_SIZES = "1000,100000,1000000"
+SPECS = ["DNAseq", "RNAseq", "Metabolomics"]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_case(template_type: str, filepath: str, chunk_size=None) -> Dict[str, float]:
+    start = time.perf_counter()
+    validator = validator_dict[template_type](Path(filepath), chunk_size=chunk_size)
+    # The constructor only lists the sheets, parse them all to time the reading
+    if chunk_size:
+        for sheet_name in validator.sheet_names:
+            for _ in validator._iter_frames(sheet_name):
+                pass
+    else:
+        validator.metadata
+    read = time.perf_counter() - start
+
+    start = time.perf_counter()
+    validator.validate()
+    validate = time.perf_counter() - start
+
+    return {
+        "read": read,
+        "validate": validate,
+        "issues": sum(1 for _ in validator.iter_issues()),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_template(template_type: str, filepath: str) -> Dict[str, float]:
+    start = time.perf_counter()
+    spec_dict[template_type]().generate_template(Path(filepath))
+    return {
+        "generate_template": time.perf_counter() - start,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def in_fresh_process(func, *args):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(func, *args).result()
+
+
+def run_suite(sizes: List[int], data_dir: Path, chunk_size=None) -> Dict[str, Dict]:
+    results: Dict[str, Dict] = {}
+    for template_type in SPECS:
+        spec = spec_dict[template_type]()
+        key = f"{template_type}/template"
+        results[key] = in_fresh_process(
+            run_template, template_type, str(data_dir / f"{template_type}_template.xlsx")
+        )
+        print_result(key, results[key])
+
+        for size in sizes:
+            for kind, invalid_rate in [("valid", 0.0), ("invalid", 0.01)]:
+                filepath = data_dir / f"{template_type}_{size}_{kind}.xlsx"
+                if not filepath.exists():
+                    generate_workbook(spec, filepath, size, invalid_rate)
+
+                key = f"{template_type}/{size}/{kind}"
+                results[key] = in_fresh_process(
+                    run_case, template_type, str(filepath), chunk_size
+                )
+                print_result(key, results[key])
+
+    return results
+
+
+def print_result(key: str, result: Dict[str, float]) -> None:
+    timings = ", ".join(
+        f"{name} {value:.3f}s"
+        for name, value in result.items()
+        if name in ("read", "validate", "generate_template")
+    )
+    extra = f", {result['issues']} issues" if "issues" in result else ""
+    print(f"{key:<32} {timings}, peak {result['peak_rss_mb']:.0f} MB{extra}", flush=True)
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    regressions = []
+    for key, result in results.items():
+        for name in ("read", "validate", "generate_template"):
+            old = baseline.get(key, {}).get(name)
+            new = result.get(name)
+            # Ignore the noise of very short timings
+            if old is None or new is None or max(old, new) < 0.05:
+                continue
+            if new > old * threshold:
+                regressions.append(f"{key} {name}: {old:.3f}s -> {new:.3f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--sizes", default=DEFAULT_SIZES, help="Comma separated numbers of rows."
+    )
+    parser.add_argument(
+        "--data-dir", help="Keep the generated workbooks in this directory."
+    )
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--save", help="Save the results as a json file.")
+    parser.add_argument("--compare", help="Compare with the results of a json file.")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_dir = Path(args.data_dir or tmpdir)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        results = run_suite(sizes, data_dir, args.chunk_size)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Startup benchmark of the metav command line.
+
+`metav --help` and `metav generate-template` never read a metadata file, so they
+must not import pandas (nor openpyxl for `--help`). Each command runs in a fresh
+interpreter with `-X importtime`, the best wall time of --repeat runs is checked
+against its budget and the imported modules against the forbidden ones.
+
+Usage::
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeat 10 --help-budget 0.3
+
+The exit status is 1 if a budget is exceeded or a forbidden module is imported.
+"""
+import sys
+import argparse
+import tempfile
+from typing import Dict, List, Set
+
+from tests.startup import COMMANDS, run_command
+
+# Budgets of the best wall time, in seconds, the interpreter startup included
+DEFAULT_BUDGETS = {"help": 0.5, "generate-template": 1.0}
+
+
+def run_suite(repeat: int, budgets: Dict[str, float]) -> List[str]:
+    failures = []
+    for command, (args, forbidden) in COMMANDS.items():
+        timings = []
+        imported: Set[str] = set()
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                elapsed, modules = run_command(
+                    [arg.format(tmpdir=tmpdir) for arg in args]
+                )
+            timings.append(elapsed)
+            imported |= modules
+
+        best = min(timings)
+        print(
+            f"{command:<20} best {best:.3f}s, budget {budgets[command]:.3f}s, "
+            f"{len(imported)} modules",
+            flush=True,
+        )
+        if best > budgets[command]:
+            failures.append(f"{command}: {best:.3f}s > {budgets[command]:.3f}s")
+        for name in forbidden:
+            if name in imported:
+                failures.append(f"{command}: imports {name}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--help-budget", type=float, default=DEFAULT_BUDGETS["help"]
+    )
+    parser.add_argument(
+        "--template-budget",
+        type=float,
+        default=DEFAULT_BUDGETS["generate-template"],
+    )
+    args = parser.parse_args()
+
+    budgets = {"help": args.help_budget, "generate-template": args.template_budget}
+    failures = run_suite(args.repeat, budgets)
+    for failure in failures:
+        print(f"Failure: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
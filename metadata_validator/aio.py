@@ -0,0 +1,161 @@
+"""Asyncio API, the validations run in an executor and never block the event loop.
+
+    async for result in validate_many(paths, "RNAseq", concurrency=4):
+        print(result.path, result.errors)
+
+The file I/O and the parsing happen in worker processes (or in the executor given
+by the caller). At most `concurrency` files are in flight or waiting to be
+consumed, so the paths are only pulled from the intake (a list, or an async
+iterable reading from a queue) as fast as the results are consumed.
+"""
+import asyncio
+from functools import partial
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Union,
+)
+
+from .batch import _init_worker
+from .report import ERROR, Issue
+from .validator import validator_dict
+
+PathLike = Union[str, Path]
+
+
+class FileResult(NamedTuple):
+    """The issues of one file, or the exception raised while validating it."""
+
+    path: str
+    issues: List[Issue]
+    exception: Optional[BaseException] = None
+
+    @property
+    def errors(self) -> int:
+        return sum(1 for issue in self.issues if issue.severity == ERROR)
+
+    @property
+    def valid(self) -> bool:
+        return self.exception is None and self.errors == 0
+
+
+def _validate(filepath: PathLike, template_type: str, kwargs: dict) -> FileResult:
+    validator = validator_dict[template_type](Path(filepath), **kwargs)
+    validator.validate()
+    return FileResult(str(filepath), list(validator.iter_issues()))
+
+
+def _check_template_type(template_type: str) -> None:
+    if not validator_dict.get(template_type):
+        raise ValueError(f"The template type {template_type} is not supported.")
+
+
+async def validate_file_async(
+    filepath: PathLike,
+    template_type: str,
+    executor: Optional[Executor] = None,
+    **kwargs: Any,
+) -> FileResult:
+    """Validate one file in the executor (the default executor of the loop if None).
+
+    The keyword arguments are passed to the validator, e.g. chunk_size or max_errors.
+    """
+    _check_template_type(template_type)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, partial(_validate, filepath, template_type, kwargs)
+    )
+
+
+async def _iterate(paths: Union[Iterable[PathLike], AsyncIterable[PathLike]]):
+    if hasattr(paths, "__aiter__"):
+        async for path in paths:
+            yield path
+    else:
+        for path in paths:
+            yield path
+
+
+async def validate_many(
+    paths: Union[Iterable[PathLike], AsyncIterable[PathLike]],
+    template_type: str,
+    concurrency: int = 4,
+    executor: Optional[Executor] = None,
+    **kwargs: Any,
+) -> AsyncIterator[FileResult]:
+    """Validate the files concurrently, yield their results as they finish.
+
+    A slot of `concurrency` is taken before a path is pulled from `paths` and given
+    back once its result is consumed, so a slow consumer stops the intake instead
+    of letting results pile up. Without an executor, a pool of `concurrency`
+    processes is started and shut down at the end. A file which can't be validated
+    yields a result with the exception, the other files go on.
+    """
+    _check_template_type(template_type)
+    if concurrency <= 0:
+        raise ValueError("concurrency must be a positive integer.")
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(
+            max_workers=concurrency,
+            initializer=_init_worker,
+            initargs=(template_type,),
+        )
+
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    done: asyncio.Queue = asyncio.Queue()
+    pending = set()
+    end = object()
+
+    async def run(path: PathLike) -> None:
+        try:
+            result = await loop.run_in_executor(
+                executor, partial(_validate, path, template_type, kwargs)
+            )
+        except Exception as e:
+            result = FileResult(str(path), [], e)
+        done.put_nowait(result)
+
+    async def feed() -> None:
+        intake = _iterate(paths)
+        try:
+            while True:
+                # Backpressure, wait for a consumed result before taking a new path
+                await slots.acquire()
+                try:
+                    path = await intake.__anext__()
+                except StopAsyncIteration:
+                    break
+                task = asyncio.create_task(run(path))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            done.put_nowait(end)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while True:
+            result = await done.get()
+            if result is end:
+                # Raise the exception of the intake, if any
+                await feeder
+                return
+            yield result
+            slots.release()
+    finally:
+        feeder.cancel()
+        for task in list(pending):
+            task.cancel()
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,105 @@
+"""Validate many metadata files in a pool of worker processes."""
+import glob
+import os
+from itertools import repeat
+from contextlib import nullcontext
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from .specs import spec_dict
+from .cache import ResultCache
+from .keyindex import KeyIndex
+from .validator import validator_dict
+from .readers import READERS
+
+# The file types which can be found in a directory
+SUPPORTED_SUFFIXES = [
+    extension for reader in READERS.values() for extension in reader.extensions
+]
+
+
+def collect_files(input: str) -> List[Path]:
+    """Expand a directory or a glob pattern into a sorted list of files."""
+    if os.path.isdir(input):
+        filepaths = [
+            path
+            for path in Path(input).iterdir()
+            if path.is_file()
+            and path.suffix in SUPPORTED_SUFFIXES
+            # Skip the lock files of excel
+            and not path.name.startswith("~$")
+        ]
+    else:
+        filepaths = [Path(path) for path in glob.glob(input) if os.path.isfile(path)]
+
+    return sorted(filepaths)
+
+
+def _init_worker(template_type: str) -> None:
+    # Compile the spec once per worker, every file of the batch reuses it
+    spec_dict[template_type]().plan
+
+
+def validate_file(
+    filepath: Path,
+    template_type: str,
+    chunk_size: Optional[int] = None,
+    use_cache: bool = False,
+    key_index: Optional[str] = None,
+) -> Tuple[str, str, str]:
+    """Validate one file, returns the file path, the errors and the warnings.
+
+    With a key index (the path of its database), the file is registered in it
+    under its resolved path.
+    """
+    cache = ResultCache() if use_cache else None
+    with KeyIndex(key_index) if key_index else nullcontext() as index:
+        validator = validator_dict[template_type](
+            filepath, chunk_size=chunk_size, cache=cache, key_index=index
+        )
+        validator.validate()
+    return str(filepath), validator.errors, validator.warnings
+
+
+def validate_batch(
+    filepaths: List[Path],
+    template_type: str,
+    jobs: int = 1,
+    chunk_size: Optional[int] = None,
+    use_cache: bool = False,
+    key_index: Optional[str] = None,
+) -> Iterator[Tuple[str, str, str]]:
+    """Validate the files with `jobs` processes.
+
+    The results are yielded in the same order as the files, whatever the order in
+    which the workers finish them. With a key index, a collision between two files
+    of the batch is reported on the file registered last.
+    """
+    if not validator_dict.get(template_type):
+        raise ValueError(f"The template type {template_type} is not supported.")
+
+    if jobs <= 1 or len(filepaths) <= 1:
+        _init_worker(template_type)
+        for filepath in filepaths:
+            yield validate_file(filepath, template_type, chunk_size, use_cache, key_index)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(filepaths)),
+        initializer=_init_worker,
+        initargs=(template_type,),
+    ) as executor:
+        yield from executor.map(
+            validate_file,
+            filepaths,
+            repeat(template_type),
+            repeat(chunk_size),
+            repeat(use_cache),
+            repeat(key_index),
+        )
+
+
+def format_report(filepath: str, error_msg: str, warning_msg: str) -> str:
+    """Format the section of one file in the combined report."""
+    return f"==> {filepath} <==\n{error_msg}\n{warning_msg}\n"
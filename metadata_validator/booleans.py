@@ -0,0 +1,35 @@
+"""Vectorized normalization of the BOOLEAN columns.
+
+TRUE/FALSE, Yes/No, Y/N and 1/0 (any case, excel booleans included) are
+accepted. Each distinct value of a column is looked up once, the cells get the
+result of their value through the codes of `pd.factorize`.
+"""
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+TRUE_VALUES = ("true", "yes", "y", "1", "1.0")
+FALSE_VALUES = ("false", "no", "n", "0", "0.0")
+
+_BOOLEANS = {
+    **{value: True for value in TRUE_VALUES},
+    **{value: False for value in FALSE_VALUES},
+}
+
+
+def parse_booleans(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Parse a column, returns the bool array and the mask of the valid cells (nulls are valid)."""
+    if values.dtype.kind == "b":
+        return (
+            values.to_numpy(dtype=bool, na_value=False),
+            np.ones(len(values), dtype=bool),
+        )
+
+    codes, uniques = pd.factorize(values.to_numpy(dtype=object))
+    # str(True) is "True" and str(1.0) is "1.0", they go through the same lookup
+    parsed = [_BOOLEANS.get(str(value).strip().casefold()) for value in uniques]
+    valid = np.array([value is not None for value in parsed] + [True], dtype=bool)
+    booleans = np.array([value is True for value in parsed] + [False], dtype=bool)
+    # The extra last entry is taken by the code -1 of the nulls
+    return booleans[codes], valid[codes]
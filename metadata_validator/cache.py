@@ -0,0 +1,154 @@
+"""Persistent caches of the metadata validator."""
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from . import __version__
+
+# Bump it when the rules or the issues of the validator change without a new
+# release, the results cached by the previous code are not used anymore
+RESULTS_VERSION = 2
+
+
+def default_cache_dir() -> Path:
+    """Return the cache directory, $XDG_CACHE_HOME/metadata-validator by default."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return Path(cache_home) / "metadata-validator"
+
+
+class ChecksumCache:
+    """MD5 checksums of files keyed by path, mtime and size.
+
+    A file is hashed again only when its mtime or size changed. The cache is a json
+    file, call `save` to persist the new entries.
+    """
+
+    def __init__(self, filepath: Optional[Union[str, Path]] = None) -> None:
+        self.file_path = (
+            Path(filepath) if filepath else default_cache_dir() / "checksums.json"
+        )
+        self._lock = threading.Lock()
+        self._dirty = False
+        # path -> [mtime_ns, size, md5sum]
+        self._entries: Dict[str, List] = {}
+
+        try:
+            with open(self.file_path) as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            # A missing or corrupted cache is the same as an empty one
+            self._entries = {}
+
+    def get(self, filepath: Path, stat: os.stat_result) -> Optional[str]:
+        entry = self._entries.get(str(filepath))
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2]
+        return None
+
+    def set(self, filepath: Path, stat: os.stat_result, md5: str) -> None:
+        with self._lock:
+            self._entries[str(filepath)] = [stat.st_mtime_ns, stat.st_size, md5]
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+
+            self.file_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first, a crash must not corrupt the cache
+            tmp_path = self.file_path.with_name(
+                f"{self.file_path.name}.{os.getpid()}.tmp"
+            )
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.file_path)
+            self._dirty = False
+
+
+class ResultCache:
+    """Validation results keyed by the content of the file, the specs and the validator.
+
+    The results are json files in a directory, the least recently used ones are
+    removed once the directory is larger than max_size bytes.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, Path]] = None,
+        max_size: int = 100 * 1024 * 1024,
+    ) -> None:
+        self.directory = Path(directory) if directory else default_cache_dir() / "results"
+        self.max_size = max_size
+
+    @staticmethod
+    def key(filepath: Union[str, Path], spec_id: str) -> str:
+        sha256 = hashlib.sha256()
+        # The rules of the validator are part of the result as much as the specs
+        validator_id = f"{__version__}:{RESULTS_VERSION}:{spec_id}"
+        sha256.update(validator_id.encode("utf-8"))
+        sha256.update(b"\0")
+
+        path = Path(filepath)
+        # A directory holds one table per file, all of them are hashed
+        filepaths = sorted(p for p in path.iterdir() if p.is_file()) if path.is_dir() else [path]
+        for filepath in filepaths:
+            if path.is_dir():
+                sha256.update(filepath.name.encode("utf-8"))
+                sha256.update(b"\0")
+            with open(filepath, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    sha256.update(block)
+        return sha256.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                result = json.load(f)
+            # Mark the entry as recently used
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return result
+
+    def set(self, key: str, result: Dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        # Remove the least recently used entries first
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Already removed by another process
+                pass
+            total -= size
@@ -0,0 +1,99 @@
+"""Verify the size and the md5sum of the data files referenced by the metadata."""
+import os
+import hashlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, NamedTuple, Optional, Union
+
+from .cache import ChecksumCache
+
+# Large reads keep the disks busy, hashlib releases the GIL while hashing them
+BUFFER_SIZE = 8 * 1024 * 1024
+
+
+class FileRecord(NamedTuple):
+    row: int
+    file_name: str
+    size: Optional[int]
+    md5sum: Optional[str]
+
+
+def md5sum(filepath: Union[str, Path], buffer_size: int = BUFFER_SIZE) -> str:
+    md5 = hashlib.md5()
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    with open(filepath, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            md5.update(view[:n])
+    return md5.hexdigest()
+
+
+def check_file(
+    record: FileRecord, data_dir: Path, cache: Optional[ChecksumCache] = None
+) -> Optional[str]:
+    """Return an error message if the file doesn't match the record, otherwise None."""
+    # An absolute file name or ../ must not reach the files outside data_dir. The
+    # path is checked before the links are followed, data_dir is often made of
+    # links to the files of the sequencing runs
+    filepath = Path(os.path.abspath(data_dir / record.file_name))
+    if Path(record.file_name).is_absolute() or not filepath.is_relative_to(
+        os.path.abspath(data_dir)
+    ):
+        return f"File {record.file_name} is outside of {data_dir}."
+    filepath = filepath.resolve()
+
+    try:
+        stat = filepath.stat()
+    except OSError:
+        return f"File {record.file_name} not found in {data_dir}."
+
+    if record.size is not None and stat.st_size != record.size:
+        # No need to hash a file with the wrong size
+        return f"File {record.file_name} has {stat.st_size} bytes, but the file_size is {record.size}."
+
+    if record.md5sum is None:
+        return None
+
+    checksum = cache.get(filepath, stat) if cache else None
+    if checksum is None:
+        checksum = md5sum(filepath)
+        if cache:
+            cache.set(filepath, stat, checksum)
+
+    if checksum != record.md5sum.lower():
+        return f"File {record.file_name} has md5sum {checksum}, but the md5sum is {record.md5sum}."
+
+    return None
+
+
+def verify_files(
+    records: Iterable[FileRecord],
+    data_dir: Union[str, Path],
+    workers: int = 8,
+    cache: Optional[ChecksumCache] = None,
+) -> Iterator[tuple]:
+    """Check the files on a thread pool, yield (record, error message) for the failed ones.
+
+    The results are yielded in the order of the records. When the generator is
+    closed early, the files which are not hashed yet are skipped.
+    """
+    data_dir = Path(data_dir)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            (record, executor.submit(check_file, record, data_dir, cache))
+            for record in records
+        ]
+        try:
+            for record, future in futures:
+                error = future.result()
+                if error:
+                    yield record, error
+        finally:
+            for _, future in futures:
+                future.cancel()
+
+            if cache:
+                cache.save()
@@ -3,16 +3,14 @@ import os
 import sys
 import click
 
-from metadata_validator.validator import DNAseqMetadataValidator
+# Only the light modules are imported here, the validator (and pandas with it)
+# is imported by the commands which validate, so `--help` and generate-template
+# start fast
+from metadata_validator.report import FORMATS
+from metadata_validator.readers import READERS
+from metadata_validator.export import DEFAULT_BATCH_SIZE, WRITERS
 from metadata_validator.specs import spec_dict
 
-validator_dict = {
-    "DNAseq": DNAseqMetadataValidator,
-    "RNAseq": None,
-    "Proteomics": None,
-    "Metabolomics": None,
-}
-
 
 @click.group()
 def cli():
@@ -24,8 +22,14 @@ def cli():
     "--input",
     "-i",
     required=True,
-    type=click.Path(exists=True, file_okay=True, dir_okay=False),
-    help="Input file path, only support xlsx file.",
+    type=click.Path(exists=True, file_okay=True, dir_okay=True),
+    help="Input file path, a xlsx file, a csv/tsv/parquet/arrow file or a directory with one such file per sheet (e.g. metadata.csv and quality_control.csv).",
+)
+@click.option(
+    "--input-format",
+    type=click.Choice(list(READERS)),
+    default=None,
+    help="Format of the input file, detected from the file extension by default.",
 )
 @click.option(
     "--output", "-o", required=True, help="Output error and warning messages as a file."
@@ -37,36 +41,268 @@ def cli():
     help="It support the following metadata tables: 'DNAseq', 'RNAseq', 'Proteomics, 'Metabolomics'",
     type=click.Choice(["DNAseq", "RNAseq", "Proteomics", "Metabolomics"]),
 )
-def validate(input, output, template_type):
+@click.option(
+    "--chunk-size",
+    "-c",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Stream the rows and validate them in chunks of the given size, the memory usage doesn't grow with the number of rows.",
+)
+@click.option(
+    "--data-dir",
+    "-d",
+    type=click.Path(exists=True, file_okay=False, dir_okay=True),
+    default=None,
+    help="Check the size and the md5sum of the files listed in the metadata, the files are searched in this directory.",
+)
+@click.option(
+    "--hash-workers",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="Number of threads used to hash the files of --data-dir.",
+)
+@click.option(
+    "--column-workers",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Check the columns on this many threads, the report is the same as the one of a serial run.",
+)
+@click.option(
+    "--checksum-cache",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="The cache of the md5sum of the files, unchanged files are not hashed again. [default: ~/.cache/metadata-validator/checksums.json]",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Always validate the file, don't use the results of a previous run of the same file.",
+)
+@click.option(
+    "--format",
+    "-f",
+    type=click.Choice(FORMATS),
+    default="text",
+    show_default=True,
+    help="Format of the output file, json and jsonl output one record per error or warning.",
+)
+@click.option(
+    "--max-errors",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Stop the validation after this number of errors, the exit status is 1 if there are errors.",
+)
+@click.option(
+    "--max-sheet-errors",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Stop the validation of a sheet after this number of errors in it.",
+)
+@click.option(
+    "--fail-fast",
+    is_flag=True,
+    default=False,
+    help="Stop the validation at the first error, the same as --max-errors 1.",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    help="Time the reading and every check, print the slowest sheets, columns and rules to stderr.",
+)
+@click.option(
+    "--profile-output",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write the profile in the collapsed stack format of flamegraph tools (implies --profile).",
+)
+@click.option(
+    "--key-index",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Check the unique columns against the other submissions of the project kept in this SQLite database, then register the file in it if it has no errors, those of --data-dir included.",
+)
+@click.option(
+    "--submission",
+    default=None,
+    help="The name of the file in the key index, the resolved path of the file by default. A submission registered again replaces its previous keys.",
+)
+def validate(
+    input,
+    output,
+    template_type,
+    chunk_size,
+    data_dir,
+    hash_workers,
+    column_workers,
+    checksum_cache,
+    no_cache,
+    format,
+    input_format,
+    max_errors,
+    max_sheet_errors,
+    fail_fast,
+    profile,
+    profile_output,
+    key_index,
+    submission,
+):
     """Console script for metadata_validator."""
-    if template_type in validator_dict.keys():
-        validator = validator_dict[template_type](input)
-        validator.validate()
+    from metadata_validator.validator import validator_dict
+    from metadata_validator.cache import ChecksumCache, ResultCache
+    from metadata_validator.profiling import Profiler
+    from metadata_validator.keyindex import KeyIndex
+
+    if validator_dict.get(template_type):
+        # The files of --data-dir may change, so their checks are never cached
+        cache = None if no_cache or data_dir else ResultCache()
+        profiler = Profiler() if profile or profile_output else None
+        index = KeyIndex(key_index) if key_index else None
+        validator = validator_dict[template_type](
+            input,
+            chunk_size=chunk_size,
+            cache=cache,
+            input_format=input_format,
+            max_errors=max_errors,
+            max_sheet_errors=max_sheet_errors,
+            fail_fast=fail_fast,
+            profiler=profiler,
+            key_index=index,
+            submission=submission,
+            column_workers=column_workers,
+            data_dir=data_dir,
+            hash_workers=hash_workers,
+            checksum_cache=ChecksumCache(checksum_cache) if data_dir else None,
+        )
+        try:
+            validator.validate()
+        finally:
+            if index is not None:
+                index.close()
 
-        error_msg = validator.errors
-        warning_msg = validator.warnings
+        if profiler is not None:
+            profiler.write_table(sys.stderr, limit=30)
+            if profile_output:
+                with open(profile_output, "w") as f:
+                    profiler.write_collapsed(f)
 
         if output:
             if os.path.exists(output):
                 raise FileExistsError("The output file already exists.")
             else:
                 with open(output, "w") as f:
-                    f.write(error_msg)
-                    f.write("\n")
-                    f.write(warning_msg)
+                    validator.write_report(f, format=format)
         else:
-            print(error_msg)
-            print("\n")
-            print(warning_msg)
+            validator.write_report(sys.stdout, format=format)
+
+        # With an error budget, the exit status tells whether the file is valid
+        budgeted = fail_fast or max_errors or max_sheet_errors
+        if budgeted and validator.has_errors:
+            sys.exit(1)
     else:
         click.echo("The template type is not supported.")
 
     return 0
 
 
-@cli.command(help="Generate metadata template as a xlsx file.")
+@cli.command(
+    name="validate-batch",
+    help="Validate all metadata files of a directory or a glob pattern.",
+)
+@click.option(
+    "--input",
+    "-i",
+    required=True,
+    help="A directory (all xlsx, csv, tsv, parquet and arrow files in it) or a glob pattern, e.g. 'submissions/*.xlsx'.",
+)
+@click.option(
+    "--output",
+    "-o",
+    required=True,
+    help="Output error and warning messages of all files as one file.",
+)
+@click.option(
+    "--template-type",
+    "-t",
+    required=True,
+    help="It support the following metadata tables: 'DNAseq', 'RNAseq', 'Proteomics, 'Metabolomics'",
+    type=click.Choice(["DNAseq", "RNAseq", "Proteomics", "Metabolomics"]),
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of worker processes.",
+)
+@click.option(
+    "--chunk-size",
+    "-c",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Stream the rows and validate them in chunks of the given size, the memory usage doesn't grow with the number of rows.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Always validate the files, don't use the results of a previous run of the same files.",
+)
+@click.option(
+    "--key-index",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Check the unique columns against the other submissions of the project kept in this SQLite database, then register each file without errors in it under its resolved path.",
+)
+def validate_batch_cmd(input, output, template_type, jobs, chunk_size, no_cache, key_index):
+    from metadata_validator.validator import validator_dict
+    from metadata_validator.batch import collect_files, validate_batch, format_report
+
+    if not validator_dict.get(template_type):
+        click.echo("The template type is not supported.")
+        return 0
+
+    if os.path.exists(output):
+        raise FileExistsError("The output file already exists.")
+
+    filepaths = collect_files(input)
+    if not filepaths:
+        click.echo(f"No files found in {input}.")
+        return 0
+
+    with open(output, "w") as f:
+        results = validate_batch(
+            filepaths,
+            template_type,
+            jobs,
+            chunk_size,
+            use_cache=not no_cache,
+            key_index=key_index,
+        )
+        for filepath, error_msg, warning_msg in results:
+            f.write(format_report(filepath, error_msg, warning_msg))
+            f.write("\n")
+
+    return 0
+
+
+@cli.command(
+    help="Validate metadata files and append their sheets to a parquet, sqlite or duckdb dataset."
+)
 @click.option(
-    "--output", "-o", required=True, help="Output metadata template as a file."
+    "--input",
+    "-i",
+    required=True,
+    help="A metadata file, a directory (all xlsx, csv, tsv, parquet and arrow files in it) or a glob pattern, e.g. 'submissions/*.xlsx'.",
+)
+@click.option(
+    "--output",
+    "-o",
+    required=True,
+    help="The dataset, a parquet directory or a sqlite or duckdb database, created if needed. A file exported again replaces its previous rows.",
 )
 @click.option(
     "--template-type",
@@ -75,8 +311,153 @@ def validate(input, output, template_type):
     help="It support the following metadata tables: 'DNAseq', 'RNAseq', 'Proteomics, 'Metabolomics'",
     type=click.Choice(["DNAseq", "RNAseq", "Proteomics", "Metabolomics"]),
 )
-def generate_template(output, template_type):
-    if template_type in spec_dict.keys():
+@click.option(
+    "--format",
+    "-f",
+    type=click.Choice(list(WRITERS)),
+    default=None,
+    help="Format of the dataset, detected from the output extension by default (.sqlite, .db, .duckdb, or a parquet directory).",
+)
+@click.option(
+    "--batch-size",
+    "-b",
+    type=click.IntRange(min=1),
+    default=DEFAULT_BATCH_SIZE,
+    show_default=True,
+    help="Number of rows written at a time.",
+)
+@click.option(
+    "--chunk-size",
+    "-c",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Stream the rows and validate them in chunks of the given size, the memory usage doesn't grow with the number of rows.",
+)
+@click.option(
+    "--allow-errors",
+    is_flag=True,
+    default=False,
+    help="Also export the files with errors, the cells which aren't numbers, booleans or dates in such columns are written as nulls, the other invalid cells as they are.",
+)
+def export(input, output, template_type, format, batch_size, chunk_size, allow_errors):
+    from metadata_validator.validator import validator_dict
+    from metadata_validator.batch import collect_files
+    from metadata_validator.export import get_writer
+
+    if not validator_dict.get(template_type):
+        click.echo("The template type is not supported.")
+        return 0
+
+    filepaths = [input] if os.path.isfile(input) else collect_files(input)
+    if not filepaths:
+        click.echo(f"No files found in {input}.")
+        return 0
+
+    skipped = 0
+    # One writer for all the files, they are appended to the same dataset
+    with get_writer(output, format, batch_size) as writer:
+        for filepath in filepaths:
+            validator = validator_dict[template_type](filepath, chunk_size=chunk_size)
+            validator.validate()
+            if validator.has_errors and not allow_errors:
+                skipped += 1
+                click.echo(f"Skipping {filepath}, it has errors:\n{validator.errors}", err=True)
+                continue
+
+            counts = validator.export(writer)
+            rows = ", ".join(f"{sheet_name} {count} rows" for sheet_name, count in counts.items())
+            click.echo(f"Exported {filepath}: {rows}")
+
+    if skipped:
+        sys.exit(1)
+    return 0
+
+
+@cli.command(
+    help="Run a validation service over HTTP, the specs and the worker processes stay warm between requests."
+)
+@click.option("--host", default="127.0.0.1", show_default=True, help="Address to listen on.")
+@click.option("--port", "-p", type=int, default=8765, show_default=True, help="Port to listen on.")
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Listen on a unix socket instead of a TCP port.",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of worker processes.  [default: number of CPUs]",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of validations in progress at once, the requests beyond it get a 503 response.  [default: --workers]",
+)
+@click.option(
+    "--root",
+    "roots",
+    multiple=True,
+    type=click.Path(exists=True, file_okay=False, dir_okay=True),
+    help="Accept file paths inside this directory, can be repeated. Without it, only uploads are accepted.",
+)
+def serve(host, port, socket_path, workers, concurrency, roots):
+    from metadata_validator.server import ValidationService, make_server
+
+    with ValidationService(workers, concurrency, roots) as service:
+        server = make_server(service, host, port, socket_path)
+        address = socket_path or f"http://{host}:{server.server_address[1]}"
+        click.echo(
+            f"Serving on {address} with {service.workers} workers, press Ctrl+C to stop."
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if socket_path and os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    return 0
+
+
+@cli.command(help="Generate metadata template as a xlsx file.")
+@click.option(
+    "--output",
+    "-o",
+    required=True,
+    help="Output metadata template as a file, or the output directory with --all.",
+)
+@click.option(
+    "--template-type",
+    "-t",
+    default=None,
+    help="It support the following metadata tables: 'DNAseq', 'RNAseq', 'Proteomics, 'Metabolomics'",
+    type=click.Choice(["DNAseq", "RNAseq", "Proteomics", "Metabolomics"]),
+)
+@click.option(
+    "--all",
+    "all_templates",
+    is_flag=True,
+    default=False,
+    help="Generate the templates of all the metadata tables into the output directory, named after the template type in lower case, e.g. rnaseq_metadata.xlsx.",
+)
+def generate_template(output, template_type, all_templates):
+    if all_templates == bool(template_type):
+        raise click.UsageError("Please give either --template-type or --all.")
+
+    if all_templates:
+        os.makedirs(output, exist_ok=True)
+        for name, spec_class in spec_dict.items():
+            filepath = os.path.join(output, f"{name.lower()}_metadata.xlsx")
+            spec_class().generate_template(filepath)
+            click.echo(f"Generated {filepath}")
+    elif template_type in spec_dict.keys():
         template = spec_dict[template_type]()
         template.generate_template(output)
     else:
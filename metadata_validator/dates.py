@@ -0,0 +1,81 @@
+"""Vectorized parsing of the DATE columns.
+
+A date cell may hold a YYYYMMDD integer (20210523, or the same digits as text), an
+ISO string (2021-05-23), an excel date or an excel serial date (44339). A column
+is parsed in one pass per kind of value into datetime64[D], the cells which are
+not dates (e.g. 20201332) become NaT.
+
+The ISO strings must be full dates, "2021-05" is not a date. The serial dates are
+only taken between 1950 and 2099, so a truncated YYYYMMDD (202105, 2021) is not
+read as a date of the year 2453 or 1905.
+"""
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# Day 0 of the serial dates of excel, the 1900 leap year bug included
+EXCEL_EPOCH = np.datetime64("1899-12-30", "D")
+# The serial dates of 1950-01-01 and 2099-12-31
+MIN_SERIAL = 18264
+MAX_SERIAL = 73050
+MIN_YYYYMMDD = 10000101
+MAX_YYYYMMDD = 99991231
+
+
+def _from_numbers(numbers: np.ndarray) -> np.ndarray:
+    """Dates of YYYYMMDD integers and of excel serial dates, NaT for the other numbers."""
+    dates = np.full(len(numbers), np.datetime64("NaT"), dtype="datetime64[D]")
+    with np.errstate(invalid="ignore"):
+        ymd = (
+            (numbers >= MIN_YYYYMMDD)
+            & (numbers <= MAX_YYYYMMDD)
+            & (numbers == np.floor(numbers))
+        )
+        serial = (numbers >= MIN_SERIAL) & (numbers < MAX_SERIAL + 1)
+
+    positions = np.flatnonzero(ymd)
+    value = numbers[positions].astype(np.int64)
+    year, month, day = value // 10000, value // 100 % 100, value % 100
+    valid = (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+    months = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+    days = months.astype("datetime64[D]") + (day - 1).astype("timedelta64[D]")
+    # 20210230 rolls over into March, it is not a date
+    valid &= days.astype("datetime64[M]") == months
+    dates[positions[valid]] = days[valid]
+
+    # The fraction of a serial date is the time of the day
+    dates[serial] = EXCEL_EPOCH + np.floor(numbers[serial]).astype(np.int64).astype(
+        "timedelta64[D]"
+    )
+    return dates
+
+
+def parse_dates(values: pd.Series) -> np.ndarray:
+    """Parse a column into datetime64[D], NaT marks the cells which are not dates."""
+    kind = values.dtype.kind
+    if kind == "M":
+        return values.to_numpy().astype("datetime64[D]")
+    if kind in "iuf":
+        return _from_numbers(values.to_numpy(dtype=np.float64, na_value=np.nan))
+    if kind == "b":
+        return np.full(len(values), np.datetime64("NaT"), dtype="datetime64[D]")
+
+    # Numbers and digits first, then the dates and the ISO strings
+    numbers = pd.to_numeric(values, errors="coerce").to_numpy(
+        dtype=np.float64, na_value=np.nan
+    )
+    dates = _from_numbers(numbers)
+    rest = np.isnan(numbers) & values.notnull().to_numpy()
+    if rest.any():
+        # The date objects pass through, the strings must be full YYYY-MM-DD dates
+        parsed = pd.to_datetime(
+            values[rest].astype(object), errors="coerce", format="%Y-%m-%d"
+        )
+        dates[rest] = parsed.to_numpy().astype("datetime64[D]")
+    return dates
+
+
+def parse_date(value: Any) -> np.datetime64:
+    """Parse one value, e.g. the min or the max of a DATE column."""
+    return parse_dates(pd.Series([value], dtype=object))[0]
@@ -0,0 +1,128 @@
+"""The dtypes of the columns, derived from the types of the specs.
+
+The readers get them as hints: the hinted columns are parsed without type
+inference, then numbers become Int64 (only integers) or float64, text the
+string dtype, categories a Categorical and booleans the boolean dtype. A numeric
+or boolean column with a cell which can't be converted is left as it was read,
+so the `number` or `boolean` rule reports each of those cells with its original
+value. The dates are kept as they were read, the `date` rule parses them and
+reports the cells as the user typed them.
+"""
+from typing import TYPE_CHECKING, Dict, Mapping, Optional, Sequence
+
+from .specs.spec import ColumnSpec, Type
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+STRING = "string"
+CATEGORY = "category"
+FLOAT = "float64"
+# Int64 when every value is an integer, float64 otherwise
+NUMBER = "number"
+DATE = "date"
+BOOLEAN = "boolean"
+
+_TYPE_DTYPES = {
+    Type.TEXT: STRING,
+    Type.CATEGORY: CATEGORY,
+    Type.FLOAT: FLOAT,
+    Type.NUMBER: NUMBER,
+    Type.DATE: DATE,
+    Type.BOOLEAN: BOOLEAN,
+}
+
+# Int64 holds every integer a float64 holds exactly
+_MAX_EXACT_INTEGER = 2**53
+
+
+def spec_dtypes(column_specs: Sequence[ColumnSpec]) -> Dict[str, str]:
+    """Map the columns of a sheet to their dtypes, the other types are inferred."""
+    return {
+        column_spec.name: _TYPE_DTYPES[column_spec.type]
+        for column_spec in column_specs
+        if column_spec.type in _TYPE_DTYPES
+    }
+
+
+def raw_dtypes(dtypes: Optional[Mapping[str, str]]) -> Optional[Dict[str, object]]:
+    """The dtypes given to the parsers, the hinted columns are read as python objects."""
+    if not dtypes:
+        return None
+    return {name: object for name in dtypes}
+
+
+def _to_number(column: "pd.Series", integers: bool) -> "pd.Series":
+    import numpy as np
+    import pandas as pd
+
+    kind = column.dtype.kind
+    if kind == "b":
+        return column
+    if kind in "iu":
+        return column.astype("Int64") if integers else column.astype(FLOAT)
+
+    numeric = column
+    if kind != "f":
+        numeric = pd.to_numeric(column, errors="coerce")
+        if numeric.dtype.kind == "b" or numeric.isnull().sum() > column.isnull().sum():
+            # The cells which are not numbers are reported by the number rule
+            return column
+
+    values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+    if integers:
+        finite = values[~np.isnan(values)]
+        if ((np.abs(finite) < _MAX_EXACT_INTEGER) & (finite == np.floor(finite))).all():
+            return numeric.astype("Int64")
+    return pd.Series(values, index=column.index, name=column.name)
+
+
+def _to_boolean(column: "pd.Series") -> "pd.Series":
+    import pandas as pd
+
+    from .booleans import parse_booleans
+
+    if isinstance(column.dtype, pd.BooleanDtype):
+        return column
+    booleans, valid = parse_booleans(column)
+    if not valid.all():
+        # The cells which are not booleans are reported by the boolean rule
+        return column
+    return pd.Series(
+        pd.arrays.BooleanArray(booleans, column.isnull().to_numpy()),
+        index=column.index,
+        name=column.name,
+    )
+
+
+def coerce_column(column: "pd.Series", dtype: str) -> "pd.Series":
+    import pandas as pd
+
+    if dtype == STRING:
+        if isinstance(column.dtype, pd.StringDtype):
+            return column
+        return column.astype(STRING)
+    if dtype == CATEGORY:
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return column
+        return column.astype(CATEGORY)
+    if dtype in (FLOAT, NUMBER):
+        return _to_number(column, dtype == NUMBER)
+    if dtype == DATE:
+        return column
+    if dtype == BOOLEAN:
+        return _to_boolean(column)
+    raise ValueError(f"Unknown dtype {dtype}.")
+
+
+def coerce_frame(
+    frame: "pd.DataFrame", dtypes: Optional[Mapping[str, str]]
+) -> "pd.DataFrame":
+    """Convert the hinted columns of a frame in place, the missing columns are ignored."""
+    if not dtypes:
+        return frame
+
+    for name, dtype in dtypes.items():
+        if name in frame.columns:
+            frame[name] = coerce_column(frame[name], dtype)
+    return frame
@@ -0,0 +1,399 @@
+"""Writer backends, they append the validated sheets of many files to one dataset.
+
+A dataset holds one table per sheet. Its columns are the columns of the specs,
+typed by the specs (text and categories as text, numbers as doubles, booleans,
+dates), after `_source` (the file the row comes from) and `_row` (the row number
+in it):
+
+- parquet: a directory, with `<sheet>/<name>-<hash>.parquet` for each file (its
+  name and a hash of the source), which pyarrow, duckdb or spark read as one
+  table per sheet
+- sqlite: a database file, the rows are inserted with executemany
+- duckdb: a database file, the frames are inserted in bulk
+
+The rows are written batch_size at a time. A file exported again replaces its
+previous rows, so a corrected submission can be exported over the old one.
+"""
+import hashlib
+import importlib.util
+import os
+import re
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Type,
+    Union,
+)
+
+from .specs.spec import ColumnSpec, Type as ColumnType
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+SOURCE = "_source"
+ROW = "_row"
+
+DEFAULT_BATCH_SIZE = 10000
+
+# Type of the specs -> type of the column in sqlite and in duckdb
+_SQLITE_TYPES = {
+    ColumnType.TEXT: "TEXT",
+    ColumnType.CATEGORY: "TEXT",
+    ColumnType.FLOAT: "REAL",
+    ColumnType.NUMBER: "REAL",
+    ColumnType.BOOLEAN: "INTEGER",
+    # ISO dates sort and compare as text
+    ColumnType.DATE: "TEXT",
+}
+_DUCKDB_TYPES = {
+    ColumnType.TEXT: "VARCHAR",
+    ColumnType.CATEGORY: "VARCHAR",
+    ColumnType.FLOAT: "DOUBLE",
+    ColumnType.NUMBER: "DOUBLE",
+    ColumnType.BOOLEAN: "BOOLEAN",
+    ColumnType.DATE: "DATE",
+}
+
+# The characters which can't be in the file name of a source
+_UNSAFE = re.compile(r"[^\w.-]+")
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _require(module: str, name: str) -> None:
+    if importlib.util.find_spec(module) is None:
+        raise ImportError(
+            f"{module} is required to export to {name}, please install it with `pip install {module}`."
+        )
+
+
+def _text(value: Any) -> str:
+    # An id read as a number keeps its digits only, 1001.0 is 1001
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def normalize_column(column: "pd.Series", type: ColumnType) -> "pd.Series":
+    """Convert a column to the type of the specs, the invalid cells become nulls."""
+    import numpy as np
+    import pandas as pd
+
+    from .booleans import parse_booleans
+    from .dates import parse_dates
+
+    if type in (ColumnType.FLOAT, ColumnType.NUMBER):
+        values = pd.to_numeric(column.astype(object), errors="coerce")
+        return values.astype("Float64")
+    if type == ColumnType.BOOLEAN:
+        booleans, valid = parse_booleans(column)
+        mask = ~valid | column.isnull().to_numpy()
+        return pd.Series(
+            pd.arrays.BooleanArray(booleans, mask), index=column.index, name=column.name
+        )
+    if type == ColumnType.DATE:
+        dates = parse_dates(column)
+        return pd.Series(dates.astype("datetime64[s]"), index=column.index, name=column.name)
+
+    if isinstance(column.dtype, pd.StringDtype):
+        return column.astype("string")
+    # Each distinct value is converted once, the code -1 of the nulls takes the last entry
+    codes, uniques = pd.factorize(column.to_numpy(dtype=object))
+    text = np.array([_text(value) for value in uniques] + [None], dtype=object)
+    return pd.Series(text[codes], index=column.index, name=column.name, dtype="string")
+
+
+def normalize_frame(
+    frame: "pd.DataFrame", column_specs: Sequence[ColumnSpec], source: str
+) -> "pd.DataFrame":
+    """The exported table of a frame, the columns of the specs in their order.
+
+    The columns missing from the frame are nulls, the other columns are dropped.
+    """
+    import pandas as pd
+
+    columns: Dict[str, Any] = {
+        SOURCE: pd.Series(source, index=frame.index, dtype="string"),
+        ROW: pd.Series(frame.index.to_numpy() + 2, index=frame.index, dtype="int64"),
+    }
+    for column_spec in column_specs:
+        column = frame[column_spec.name] if column_spec.name in frame.columns else None
+        if column is None:
+            column = pd.Series(None, index=frame.index, dtype=object)
+        columns[column_spec.name] = normalize_column(column, column_spec.type)
+    return pd.DataFrame(columns, index=frame.index)
+
+
+def _batches(frames: Iterable["pd.DataFrame"], batch_size: int) -> Iterator["pd.DataFrame"]:
+    """Slice the frames into batches of at most batch_size rows."""
+    for frame in frames:
+        for start in range(0, len(frame), batch_size):
+            yield frame.iloc[start : start + batch_size]
+
+
+class BaseWriter:
+    """Base class of the writer backends.
+
+    `write_sheet` appends the frames (see `normalize_frame`) of a file to the table
+    of a sheet, after the removal of the rows previously exported from that file.
+    """
+
+    name = "base"
+    extensions: List[str] = []
+
+    def __init__(
+        self, filepath: Union[str, Path], batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> None:
+        if batch_size <= 0:
+            raise ValueError("batch_size must be a positive integer.")
+        self.file_path = Path(filepath)
+        self.batch_size = batch_size
+
+    def write_sheet(
+        self,
+        sheet_name: str,
+        column_specs: Sequence[ColumnSpec],
+        frames: Iterable["pd.DataFrame"],
+        source: str,
+    ) -> int:
+        """Write the rows of one file, returns the number of rows."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class ParquetWriter(BaseWriter):
+    name = "parquet"
+    extensions = [".parquet", ".pq"]
+
+    def _schema(self, column_specs: Sequence[ColumnSpec]):
+        import pyarrow as pa
+
+        types = {
+            ColumnType.TEXT: pa.string(),
+            ColumnType.CATEGORY: pa.string(),
+            ColumnType.FLOAT: pa.float64(),
+            ColumnType.NUMBER: pa.float64(),
+            ColumnType.BOOLEAN: pa.bool_(),
+            ColumnType.DATE: pa.date32(),
+        }
+        fields = [
+            pa.field(SOURCE, pa.string(), nullable=False),
+            pa.field(ROW, pa.int64(), nullable=False),
+        ]
+        fields += [
+            pa.field(column_spec.name, types[column_spec.type]) for column_spec in column_specs
+        ]
+        return pa.schema(fields)
+
+    def write_sheet(
+        self,
+        sheet_name: str,
+        column_specs: Sequence[ColumnSpec],
+        frames: Iterable["pd.DataFrame"],
+        source: str,
+    ) -> int:
+        _require("pyarrow", self.name)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = self._schema(column_specs)
+        directory = self.file_path / sheet_name
+        directory.mkdir(parents=True, exist_ok=True)
+        # The sources are paths, the files of two directories may have the same name
+        name = _UNSAFE.sub("_", Path(source).name).lstrip("_.") or "source"
+        digest = hashlib.sha1(source.encode()).hexdigest()[:12]
+        path = directory / f"{name}-{digest}.parquet"
+        # Written aside then renamed, a reader of the dataset never sees a partial file
+        partial = path.with_name(f".{path.name}.partial")
+
+        rows = 0
+        try:
+            with pq.ParquetWriter(partial, schema) as writer:
+                for batch in _batches(frames, self.batch_size):
+                    # One row group per batch
+                    writer.write_table(
+                        pa.Table.from_pandas(batch, schema=schema, preserve_index=False)
+                    )
+                    rows += len(batch)
+            os.replace(partial, path)
+        finally:
+            if partial.exists():
+                partial.unlink()
+        return rows
+
+
+class SQLiteWriter(BaseWriter):
+    name = "sqlite"
+    extensions = [".sqlite", ".sqlite3", ".db"]
+
+    def __init__(
+        self, filepath: Union[str, Path], batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> None:
+        import sqlite3
+
+        super().__init__(filepath, batch_size)
+        # Transactions are opened explicitly, one per sheet of a file
+        self._connection = sqlite3.connect(str(self.file_path), isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+
+    def write_sheet(
+        self,
+        sheet_name: str,
+        column_specs: Sequence[ColumnSpec],
+        frames: Iterable["pd.DataFrame"],
+        source: str,
+    ) -> int:
+        table = _quote(sheet_name)
+        columns = [SOURCE, ROW] + [column_spec.name for column_spec in column_specs]
+        definitions = [f"{_quote(SOURCE)} TEXT NOT NULL", f"{_quote(ROW)} INTEGER NOT NULL"]
+        definitions += [
+            f"{_quote(column_spec.name)} {_SQLITE_TYPES[column_spec.type]}"
+            for column_spec in column_specs
+        ]
+        dates = [
+            column_spec.name for column_spec in column_specs if column_spec.type == ColumnType.DATE
+        ]
+        insert = (
+            f"INSERT INTO {table} ({', '.join(map(_quote, columns))}) "
+            f"VALUES ({', '.join('?' * len(columns))})"
+        )
+
+        connection = self._connection
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            f"({', '.join(definitions)}, PRIMARY KEY ({_quote(SOURCE)}, {_quote(ROW)}))"
+        )
+        rows = 0
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(f"DELETE FROM {table} WHERE {_quote(SOURCE)} = ?", (source,))
+            for batch in _batches(frames, self.batch_size):
+                values = []
+                for column in columns:
+                    series = batch[column]
+                    if column in dates:
+                        series = series.dt.strftime("%Y-%m-%d")
+                    # Python objects, the nulls as None
+                    values.append(series.to_numpy(dtype=object, na_value=None))
+                connection.executemany(insert, zip(*values))
+                rows += len(batch)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return rows
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class DuckDBWriter(BaseWriter):
+    name = "duckdb"
+    extensions = [".duckdb", ".ddb"]
+
+    def __init__(
+        self, filepath: Union[str, Path], batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> None:
+        _require("duckdb", self.name)
+        import duckdb
+
+        super().__init__(filepath, batch_size)
+        self._connection = duckdb.connect(str(self.file_path))
+
+    def write_sheet(
+        self,
+        sheet_name: str,
+        column_specs: Sequence[ColumnSpec],
+        frames: Iterable["pd.DataFrame"],
+        source: str,
+    ) -> int:
+        table = _quote(sheet_name)
+        columns = [SOURCE, ROW] + [column_spec.name for column_spec in column_specs]
+        definitions = [f"{_quote(SOURCE)} VARCHAR NOT NULL", f"{_quote(ROW)} BIGINT NOT NULL"]
+        definitions += [
+            f"{_quote(column_spec.name)} {_DUCKDB_TYPES[column_spec.type]}"
+            for column_spec in column_specs
+        ]
+        insert = (
+            f"INSERT INTO {table} ({', '.join(map(_quote, columns))}) "
+            f"SELECT {', '.join(map(_quote, columns))} FROM batch"
+        )
+
+        connection = self._connection
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(definitions)})")
+        rows = 0
+        connection.begin()
+        try:
+            connection.execute(f"DELETE FROM {table} WHERE {_quote(SOURCE)} = ?", [source])
+            for batch in _batches(frames, self.batch_size):
+                # The frame is scanned by duckdb in place, no row goes through python
+                connection.register("batch", batch)
+                connection.execute(insert)
+                connection.unregister("batch")
+                rows += len(batch)
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        return rows
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+WRITERS: Dict[str, Type[BaseWriter]] = {}
+
+
+def register_writer(writer_class: Type[BaseWriter]) -> Type[BaseWriter]:
+    """Register a writer backend under its name, it can be used as a decorator."""
+    WRITERS[writer_class.name] = writer_class
+    return writer_class
+
+
+for _writer_class in [ParquetWriter, SQLiteWriter, DuckDBWriter]:
+    register_writer(_writer_class)
+
+
+def detect_output_format(filepath: Union[str, Path]) -> str:
+    """Find the writer of a dataset by its extension, a directory is a parquet dataset."""
+    path = Path(filepath)
+    for writer_class in WRITERS.values():
+        if path.suffix in writer_class.extensions:
+            return writer_class.name
+    if path.is_dir() or not path.suffix:
+        return ParquetWriter.name
+
+    raise ValueError(
+        f"Unsupported output format of {filepath}, please choose one of {list(WRITERS)}."
+    )
+
+
+def get_writer(
+    filepath: Union[str, Path],
+    format: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> BaseWriter:
+    format = format or detect_output_format(filepath)
+    if format not in WRITERS:
+        raise ValueError(
+            f"Unknown output format {format}, please choose one of {list(WRITERS)}."
+        )
+    return WRITERS[format](filepath, batch_size)
@@ -0,0 +1,204 @@
+"""Project-wide index of the unique keys, in a SQLite database.
+
+A project is made of many submissions, each validated on its own. The values of
+the unique columns (e.g. file_name, library_id) of every submission are kept in
+the index, so a new submission is checked against all the earlier ones:
+
+    with KeyIndex("project.sqlite") as key_index:
+        collisions = key_index.register("submission_42.xlsx", keys)
+
+Only the submissions without collision are stored, so a rejected submission never
+collides with its corrected version.
+
+The keys are stored in a WITHOUT ROWID table whose primary key starts with
+(column, key), so a lookup is one seek in the b-tree whatever the size of the
+project. A submission registered again replaces its previous keys.
+"""
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Sequence, Tuple, Union
+
+# (sheet, column) -> key -> the excel row numbers of the key
+Keys = Mapping[Tuple[str, str], Mapping[str, Sequence[int]]]
+
+# Rows sent to SQLite per executemany call
+BATCH_SIZE = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    registered REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS columns (
+    id INTEGER PRIMARY KEY,
+    sheet TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (sheet, name)
+);
+CREATE TABLE IF NOT EXISTS keys (
+    column_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    submission_id INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    PRIMARY KEY (column_id, key, submission_id, row)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS keys_submission ON keys (submission_id);
+"""
+
+
+class Collision(NamedTuple):
+    """A key of the submission which is already used by another submission."""
+
+    sheet: str
+    column: str
+    key: str
+    row: int
+    submission: str
+    other_row: int
+
+
+def _batches(rows: Iterator[tuple], size: int = BATCH_SIZE) -> Iterator[List[tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class KeyIndex:
+    """The unique keys of all the submissions of a project.
+
+    The database may be shared by several processes, `register` checks and
+    stores the keys of a submission in one write transaction, so two submissions
+    validated at the same time can't both miss their collision.
+    """
+
+    def __init__(self, filepath: Union[str, Path], timeout: float = 60.0) -> None:
+        self.file_path = Path(filepath)
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        # Transactions are opened explicitly, see `register`
+        self._connection = sqlite3.connect(
+            str(self.file_path), timeout=timeout, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+        self._column_ids: Dict[Tuple[str, str], int] = {}
+
+    def _column_id(self, sheet: str, column: str, new: Dict[Tuple[str, str], int]) -> int:
+        """The id of a column, the ids inserted by the transaction are kept in new."""
+        column_id = self._column_ids.get((sheet, column)) or new.get((sheet, column))
+        if column_id is None:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO columns (sheet, name) VALUES (?, ?)", (sheet, column)
+            )
+            (column_id,) = self._connection.execute(
+                "SELECT id FROM columns WHERE sheet = ? AND name = ?", (sheet, column)
+            ).fetchone()
+            new[(sheet, column)] = column_id
+        return column_id
+
+    def check(self, submission: str, keys: Keys) -> List[Collision]:
+        """Returns the keys of a submission used by other submissions, stores nothing."""
+        return self.register(submission, keys, store=False)
+
+    def register(self, submission: str, keys: Keys, store: bool = True) -> List[Collision]:
+        """Store the keys of a submission, returns its keys used by other submissions.
+
+        The keys are only stored when store is True and there is no collision, else
+        the index is left as it was (the previous keys of the submission included).
+        The collisions are ordered by column, then by row.
+        """
+        connection = self._connection
+        # The ids of the columns are only cached once they are committed
+        column_ids: Dict[Tuple[str, str], int] = {}
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT INTO submissions (name, registered) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET registered = excluded.registered",
+                (submission, time.time()),
+            )
+            (submission_id,) = connection.execute(
+                "SELECT id FROM submissions WHERE name = ?", (submission,)
+            ).fetchone()
+            connection.execute("DELETE FROM keys WHERE submission_id = ?", (submission_id,))
+
+            connection.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS batch "
+                "(column_id INTEGER, key TEXT, row INTEGER)"
+            )
+            connection.execute("DELETE FROM temp.batch")
+            for (sheet, column), index in keys.items():
+                column_id = self._column_id(sheet, column, column_ids)
+                rows = (
+                    (column_id, key, row) for key, key_rows in index.items() for row in key_rows
+                )
+                for batch in _batches(rows):
+                    connection.executemany("INSERT INTO temp.batch VALUES (?, ?, ?)", batch)
+
+            # One primary key seek per key of the submission
+            collisions = [
+                Collision(*record)
+                for record in connection.execute(
+                    "SELECT c.sheet, c.name, b.key, b.row, s.name, k.row "
+                    "FROM temp.batch AS b "
+                    "JOIN keys AS k ON k.column_id = b.column_id AND k.key = b.key "
+                    "JOIN submissions AS s ON s.id = k.submission_id "
+                    "JOIN columns AS c ON c.id = b.column_id "
+                    "ORDER BY b.column_id, b.row, s.name, k.row"
+                )
+            ]
+            if not store or collisions:
+                connection.execute("ROLLBACK")
+                return collisions
+
+            connection.execute(
+                "INSERT OR IGNORE INTO keys SELECT column_id, key, ?, row FROM temp.batch",
+                (submission_id,),
+            )
+            connection.execute("DELETE FROM temp.batch")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self._column_ids.update(column_ids)
+        return collisions
+
+    def remove(self, submission: str) -> None:
+        """Forget the keys of a withdrawn submission."""
+        connection = self._connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "DELETE FROM keys WHERE submission_id IN "
+                "(SELECT id FROM submissions WHERE name = ?)",
+                (submission,),
+            )
+            connection.execute("DELETE FROM submissions WHERE name = ?", (submission,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def submissions(self) -> List[str]:
+        return [
+            name
+            for (name,) in self._connection.execute(
+                "SELECT name FROM submissions ORDER BY registered, name"
+            )
+        ]
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
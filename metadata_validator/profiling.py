@@ -0,0 +1,146 @@
+"""Profiling of a validation, the wall time, the rows and the violations of each step.
+
+    profiler = Profiler()
+    validator = RNAseqMetadataValidator(path, profiler=profiler)
+    validator.validate()
+    profiler.write_table(sys.stderr)
+    with open("validate.folded", "w") as f:
+        profiler.write_collapsed(f)
+
+Each step is recorded under a path such as ("columns", "metadata", "sample_id",
+"regex"): the stage (read, columns, rows, files), the sheet, the column and the
+rule. The time of a path includes the time of its children. Without a profiler
+the validator doesn't call any of this, the hooks cost one `is None` check.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+ProfilePath = Tuple[str, ...]
+
+# The sheet of the opening of the file, brackets can't be in an excel sheet name
+OPEN = "[open]"
+
+
+class Stat:
+    """The totals of one path."""
+
+    __slots__ = ("calls", "seconds", "rows", "violations")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.violations = 0
+
+
+class Profiler:
+    """Collect the time, the rows and the violations by path."""
+
+    def __init__(self) -> None:
+        self.stats: Dict[ProfilePath, Stat] = {}
+        # The columns may be checked on several threads
+        self._lock = threading.Lock()
+
+    def add(
+        self, path: ProfilePath, seconds: float, rows: int = 0, violations: int = 0
+    ) -> None:
+        with self._lock:
+            stat = self.stats.get(path)
+            if stat is None:
+                stat = self.stats[path] = Stat()
+            stat.calls += 1
+            stat.seconds += seconds
+            stat.rows += rows
+            stat.violations += violations
+
+    @contextmanager
+    def measure(self, path: ProfilePath, rows: int = 0) -> Iterator[Stat]:
+        """Time the block, the rows and the violations can be counted on the yielded Stat."""
+        counts = Stat()
+        counts.rows = rows
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            self.add(path, time.perf_counter() - start, counts.rows, counts.violations)
+
+    def iter_frames(self, path: ProfilePath, frames: Iterator[Any]) -> Iterator[Any]:
+        """Time the reading of each frame, the time of the consumer is not counted."""
+        while True:
+            start = time.perf_counter()
+            try:
+                frame = next(frames)
+            except StopIteration:
+                return
+            self.add(path, time.perf_counter() - start, len(frame))
+            yield frame
+
+    def iter_rules(
+        self, path: ProfilePath, rules: Iterator[Tuple[str, str, Any]], rows: int
+    ) -> Iterator[Tuple[str, str, Any]]:
+        """Time each rule of `rules.column_violations`, the mask and its handling by the consumer."""
+        while True:
+            start = time.perf_counter()
+            try:
+                rule = next(rules)
+            except StopIteration:
+                return
+            try:
+                yield rule
+            finally:
+                # Also recorded when the consumer stops at this rule
+                self.add(
+                    path + (rule[0],),
+                    time.perf_counter() - start,
+                    rows,
+                    int(rule[2].sum()),
+                )
+
+    def self_seconds(self) -> Dict[ProfilePath, float]:
+        """The time of each path without the time of its children."""
+        own = {path: stat.seconds for path, stat in self.stats.items()}
+        for path, stat in self.stats.items():
+            parent = path[:-1]
+            if parent in own:
+                own[parent] -= stat.seconds
+        # The clock resolution may leave a parent slightly below its children
+        return {path: max(seconds, 0.0) for path, seconds in own.items()}
+
+    def ranked(self) -> List[Tuple[ProfilePath, Stat, float]]:
+        """The paths by their own time, the slowest first."""
+        own = self.self_seconds()
+        return sorted(
+            ((path, stat, own[path]) for path, stat in self.stats.items()),
+            key=lambda item: item[2],
+            reverse=True,
+        )
+
+    def write_table(self, fp: IO[str], limit: Optional[int] = None) -> None:
+        rows = self.ranked()
+        if limit is not None:
+            rows = rows[:limit]
+
+        total = sum(self.self_seconds().values()) or 1.0
+        fp.write(
+            f"{'self s':>9} {'%':>6} {'total s':>9} {'calls':>7} {'rows':>10} "
+            f"{'violations':>10}  path\n"
+        )
+        for path, stat, own in rows:
+            fp.write(
+                f"{own:9.4f} {100 * own / total:6.1f} {stat.seconds:9.4f} "
+                f"{stat.calls:7d} {stat.rows:10d} {stat.violations:10d}  "
+                f"{' > '.join(path)}\n"
+            )
+
+    def write_collapsed(self, fp: IO[str]) -> None:
+        """Write the own time of each path in microseconds, one `a;b;c count` line per path.
+
+        This is the input format of flamegraph.pl, speedscope and inferno.
+        """
+        for path, seconds in sorted(self.self_seconds().items()):
+            microseconds = int(round(seconds * 1e6))
+            if microseconds:
+                frames = ";".join(frame.replace(";", ",") for frame in path)
+                fp.write(f"{frames} {microseconds}\n")
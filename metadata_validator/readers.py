@@ -0,0 +1,458 @@
+"""Reader backends, they turn an input file into one DataFrame per sheet.
+
+An xlsx workbook holds every sheet. The other formats hold one table per file:
+a directory maps each sheet to `<sheet>.<ext>` in it, and a single file is the
+sheet it is named after (`metadata.csv`, `submission.quality_control.csv`) or
+else the first sheet.
+
+Every DataFrame is indexed by the row position in its sheet (0 is the first row
+after the header), so index + 2 is the row number shown to the user. The dtypes
+hints (see `dtypes`) convert the columns of the specs while they are read.
+"""
+import os
+import importlib.util
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Type,
+    Union,
+)
+
+from .dtypes import CATEGORY, STRING, coerce_frame, raw_dtypes
+
+# pandas is imported by the methods which read a file, the registry of the
+# backends is also used by the command line before anything is read
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pyarrow is optional, it is only imported by the backends which use it
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def _require_pyarrow(name: str) -> None:
+    if not HAS_PYARROW:
+        raise ImportError(
+            f"pyarrow is required to read {name} files, please install it with `pip install pyarrow`."
+        )
+
+
+def _project(columns: Sequence[str], wanted: Optional[Sequence[str]]) -> List[str]:
+    """Keep the wanted columns which exist, in the order of the file."""
+    if wanted is None:
+        return list(columns)
+    wanted = set(wanted)
+    return [column for column in columns if column in wanted]
+
+
+class BaseReader:
+    """Base class of the reader backends.
+
+    `read` loads a whole sheet, `iter_chunks` streams it chunk_size rows at a time.
+    Both accept a column projection and dtypes hints (column -> dtype of `dtypes`),
+    the columns which don't exist are ignored.
+    """
+
+    name = "base"
+    extensions: List[str] = []
+
+    def __init__(self, filepath: Union[str, Path], sheet_names: Sequence[str]) -> None:
+        self.file_path = Path(filepath)
+        self.raw_sheet_names = list(sheet_names)
+
+    @property
+    def sheet_names(self) -> List[str]:
+        raise NotImplementedError
+
+    def read(
+        self,
+        sheet_name: str,
+        columns: Optional[Sequence[str]] = None,
+        dtypes: Optional[Mapping[str, str]] = None,
+    ) -> "pd.DataFrame":
+        raise NotImplementedError
+
+    def iter_chunks(
+        self,
+        sheet_name: str,
+        chunk_size: int,
+        columns: Optional[Sequence[str]] = None,
+        dtypes: Optional[Mapping[str, str]] = None,
+    ) -> Iterator["pd.DataFrame"]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class ExcelReader(BaseReader):
+    name = "excel"
+    extensions = [".xlsx"]
+
+    def __init__(self, filepath: Union[str, Path], sheet_names: Sequence[str]) -> None:
+        super().__init__(filepath, sheet_names)
+        self._workbook: Optional["pd.ExcelFile"] = None
+
+    def _open(self) -> "pd.ExcelFile":
+        import pandas as pd
+
+        # Open the workbook only once, the zip archive and the shared strings
+        # table are parsed here and reused by every sheet.
+        if self._workbook is None:
+            self._workbook = pd.ExcelFile(self.file_path)
+        return self._workbook
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return list(self._open().sheet_names)
+
+    def read(
+        self,
+        sheet_name: str,
+        columns: Optional[Sequence[str]] = None,
+        dtypes: Optional[Mapping[str, str]] = None,
+    ) -> "pd.DataFrame":
+        usecols = None if columns is None else (lambda column: column in columns)
+        # The hinted columns skip the type inference of pandas
+        frame = self._open().parse(
+            sheet_name=sheet_name, usecols=usecols, dtype=raw_dtypes(dtypes)
+        )
+        return coerce_frame(frame, dtypes)
+
+    def iter_chunks(
+        self,
+        sheet_name: str,
+        chunk_size: int,
+        columns: Optional[Sequence[str]] = None,
+        dtypes: Optional[Mapping[str, str]] = None,
+    ) -> Iterator["pd.DataFrame"]:
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook[sheet_name].iter_rows(values_only=True)
+            header = next(rows, ())
+            names = [
+                f"Unnamed: {i}" if name is None else name
+                for i, name in enumerate(header)
+            ]
+
+            offset = 0
+            chunk: List[tuple] = []
+            # Blank rows are only kept when they are followed by data, like pd.read_excel
+            blank: List[tuple] = []
+            for row in rows:
+                if all(value is None for value in row):
+                    blank.append(row)
+                    continue
+
+                chunk.extend(blank)
+                blank = []
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    yield self._make_frame(chunk, names, offset, columns, dtypes)
+                    offset += len(chunk)
+                    chunk = []
+
+            if chunk or offset == 0:
+                yield self._make_frame(chunk, names, offset, columns, dtypes)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _make_frame(
+        rows: List[tuple],
+        names: List[Any],
+        offset: int,
+        columns: Optional[Sequence[str]] = None,
+        dtypes: Optional[Mapping[str, str]] = None,
+    ) -> "pd.DataFrame":
+        import pandas as pd
+
+        width = len(names)
+        frame = pd.DataFrame(
+            [row[:width] for row in rows],
+            columns=names,
+            index=pd.RangeIndex(offset, offset + len(rows)),
+            # The rows are converted column by column from the hints, not inferred
+            dtype=object if dtypes else None,
+        )
+        if columns is not None:
+            frame = frame[_project(frame.columns, columns)].copy()
+        return coerce_frame(frame, dtypes)
+
+    def close(self) -> None:
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+
+
+class TableReader(BaseReader):
+    """Base class of the formats with one table per file."""
+
+    def __init__(self, filepath: Union[str, Path], sheet_names: Sequence[str]) -> None:
+        super().__init__(filepath, sheet_names)
+        self._tables = self._resolve_tables()
+
+    def _resolve_tables(self) -> Dict[str, Path]:
+        if self.file_path.is_dir():
+            tables = {}
+            for sheet_name in self.raw_sheet_names:
+                for extension in self.extensions:
+                    path = self.file_path / f"{sheet_name}{extension}"
+                    if path.is_file():
+                        tables[sheet_name] = path
+                        break
+            return tables
+
+        stem = self.file_path.name[: -len(self._extension(self.file_path))]
+        for sheet_name in self.raw_sheet_names:
+            if stem == sheet_name or stem.endswith(f".{sheet_name}"):
+                return {sheet_name: self.file_path}
+        return {self.raw_sheet_names[0]: self.file_path} if self.raw_sheet_names else {}
+
+    def _extension(self, path: Path) -> str:
+        for extension in self.extensions:
+            if path.name.endswith(extension):
+                return extension
+        return path.suffix
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return list(self._tables.keys())
+
+    def _table(self, sheet_name: str) -> Path:
+        if sheet_name not in self._tables:
+            raise ValueError(f"Table named '{sheet_name}' not found")
+        return self._tables[sheet_name]
+
+
+class CSVReader(TableReader):
+    name = "csv"
+    extensions = [".csv"]
+    delimiter = ","
+
+    def _header(self, path: Path) -> List[str]:
+        import pandas as pd
+
+        return list(pd.read_csv(path, sep=self.delimiter, nrows=0).columns)
+
+    @staticmethod
+    def _text_columns(dtypes: Optional[Mapping[str, str]]) -> List[str]:
+        """The columns parsed as text, e.g. an id like 00123 must not become a number."""
+        if not dtypes:
+            return []
+        return [name for name, dtype in dtypes.items() if dtype in (STRING, CATEGORY)]
+
+    def read(
+        self,
+        sheet_name: str,
+        columns: Optional[Sequence[str]] = None,
+        dtypes: Optional[Mapping[str, str]] = None,
+    ) -> "pd.DataFrame":
+        path = self._table(sheet_name)
+        include = None if columns is None else _project(self._header(path), columns)
+
+        text_columns = self._text_columns(dtypes)
+        if HAS_PYARROW:
+            import pyarrow as pa
+            from pyarrow import csv
+
+            # Multi-threaded parser, only the projected columns are converted
+            table = csv.read_csv(
+                path,
+                read_options=csv.ReadOptions(use_threads=True),
+                parse_options=csv.ParseOptions(delimiter=self.delimiter),
+                # Empty cells are nulls, like pd.read_csv
+                convert_options=csv.ConvertOptions(
+                    include_columns=include,
+                    strings_can_be_null=True,
+                    column_types={name: pa.string() for name in text_columns},
+                ),
+            )
+            return coerce_frame(table.to_pandas(), dtypes)
+
+        import pandas as pd
+
+        frame = pd.read_csv(
+            path,
+            sep=self.delimiter,
+            usecols=include,
+            dtype={name: object for name in text_columns} or None,
+        )
+        return coerce_frame(frame, dtypes)
+
+    def iter_chunks(
+        self,
+        sheet_name: str,
+        chunk_size: int,
+        columns: Optional[Sequence[str]] = None,
+        dtypes: Optional[Mapping[str, str]] = None,
+    ) -> Iterator["pd.DataFrame"]:
+        import pandas as pd
+
+        path = self._table(sheet_name)
+        include = None if columns is None else _project(self._header(path), columns)
+        header_only = True
+        # The index of the chunks goes on from one chunk to the next
+        text_columns = self._text_columns(dtypes)
+        with pd.read_csv(
+            path,
+            sep=self.delimiter,
+            usecols=include,
+            chunksize=chunk_size,
+            dtype={name: object for name in text_columns} or None,
+        ) as chunks:
+            for chunk in chunks:
+                header_only = False
+                yield coerce_frame(chunk, dtypes)
+
+        if header_only:
+            yield self.read(sheet_name, columns, dtypes)
+
+
+class TSVReader(CSVReader):
+    name = "tsv"
+    extensions = [".tsv"]
+    delimiter = "\t"
+
+
+class ParquetReader(TableReader):
+    name = "parquet"
+    extensions = [".parquet", ".pq"]
+
+    def read(
+        self,
+        sheet_name: str,
+        columns: Optional[Sequence[str]] = None,
+        dtypes: Optional[Mapping[str, str]] = None,
+    ) -> "pd.DataFrame":
+        _require_pyarrow(self.name)
+        import pyarrow.parquet as pq
+
+        path = self._table(sheet_name)
+        names = pq.read_schema(path).names
+        # Column projection, the other columns are never read from the disk
+        table = pq.read_table(path, columns=_project(names, columns))
+        return coerce_frame(table.to_pandas(), dtypes)
+
+    def iter_chunks(
+        self,
+        sheet_name: str,
+        chunk_size: int,
+        columns: Optional[Sequence[str]] = None,
+        dtypes: Optional[Mapping[str, str]] = None,
+    ) -> Iterator["pd.DataFrame"]:
+        _require_pyarrow(self.name)
+        import pandas as pd
+        import pyarrow.parquet as pq
+
+        path = self._table(sheet_name)
+        with pq.ParquetFile(path) as parquet_file:
+            projection = _project(parquet_file.schema_arrow.names, columns)
+            offset = 0
+            for batch in parquet_file.iter_batches(
+                batch_size=chunk_size, columns=projection
+            ):
+                frame = batch.to_pandas()
+                frame.index = pd.RangeIndex(offset, offset + len(frame))
+                offset += len(frame)
+                yield coerce_frame(frame, dtypes)
+
+            if offset == 0:
+                empty = parquet_file.schema_arrow.empty_table().select(projection)
+                yield coerce_frame(empty.to_pandas(), dtypes)
+
+
+class ArrowReader(TableReader):
+    name = "arrow"
+    extensions = [".arrow", ".feather", ".ipc"]
+
+    def _read_table(self, sheet_name: str, columns: Optional[Sequence[str]]):
+        _require_pyarrow(self.name)
+        import pyarrow as pa
+
+        path = self._table(sheet_name)
+        # Memory mapped, the batches are not copied until they are converted
+        with pa.memory_map(str(path)) as source:
+            table = pa.ipc.open_file(source).read_all()
+        return table.select(_project(table.column_names, columns))
+
+    def read(
+        self,
+        sheet_name: str,
+        columns: Optional[Sequence[str]] = None,
+        dtypes: Optional[Mapping[str, str]] = None,
+    ) -> "pd.DataFrame":
+        return coerce_frame(self._read_table(sheet_name, columns).to_pandas(), dtypes)
+
+    def iter_chunks(
+        self,
+        sheet_name: str,
+        chunk_size: int,
+        columns: Optional[Sequence[str]] = None,
+        dtypes: Optional[Mapping[str, str]] = None,
+    ) -> Iterator["pd.DataFrame"]:
+        import pandas as pd
+
+        table = self._read_table(sheet_name, columns)
+        if table.num_rows == 0:
+            yield coerce_frame(table.to_pandas(), dtypes)
+            return
+
+        for offset in range(0, table.num_rows, chunk_size):
+            frame = table.slice(offset, chunk_size).to_pandas()
+            frame.index = pd.RangeIndex(offset, offset + len(frame))
+            yield coerce_frame(frame, dtypes)
+
+
+READERS: Dict[str, Type[BaseReader]] = {}
+
+
+def register_reader(reader_class: Type[BaseReader]) -> Type[BaseReader]:
+    """Register a reader backend under its name, it can be used as a decorator."""
+    READERS[reader_class.name] = reader_class
+    return reader_class
+
+
+for _reader_class in [ExcelReader, CSVReader, TSVReader, ParquetReader, ArrowReader]:
+    register_reader(_reader_class)
+
+
+def detect_format(filepath: Union[str, Path]) -> str:
+    """Find the reader of a file by its extension, or of a directory by its files."""
+    path = Path(filepath)
+    names = sorted(os.listdir(path)) if path.is_dir() else [path.name]
+    for name in names:
+        for reader_class in READERS.values():
+            if any(name.endswith(extension) for extension in reader_class.extensions):
+                return reader_class.name
+
+    raise ValueError(
+        f"Unsupported file format of {filepath}, please choose one of {list(READERS)}."
+    )
+
+
+def get_reader(
+    filepath: Union[str, Path],
+    sheet_names: Sequence[str],
+    format: Optional[str] = None,
+) -> BaseReader:
+    format = format or detect_format(filepath)
+    if format not in READERS:
+        raise ValueError(
+            f"Unknown input format {format}, please choose one of {list(READERS)}."
+        )
+    return READERS[format](filepath, sheet_names)
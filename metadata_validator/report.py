@@ -0,0 +1,96 @@
+"""Structured validation issues and the text/json/jsonl reports built from them."""
+import json
+import datetime
+from itertools import groupby
+from typing import Any, Dict, IO, Iterable, Iterator, NamedTuple, Optional, Sequence
+
+ERROR = "error"
+WARNING = "warning"
+
+# How many rows are listed for each message of the text report
+ROWS_LIMIT = 10
+
+FORMATS = ["text", "json", "jsonl"]
+
+
+class Issue(NamedTuple):
+    """One error or warning.
+
+    Cell issues have a row (the excel row number, the header is row 1) and the
+    offending value, sheet and column issues leave them as None. Cell issues of the
+    same rule share the same message object, so millions of them stay compact. A
+    value which is not one of the options may have the closest option as suggestion.
+    """
+
+    severity: str
+    sheet: str
+    column: Optional[str]
+    row: Optional[int]
+    rule: str
+    value: Any
+    message: str
+    suggestion: Any = None
+
+
+def to_builtin(value: Any) -> Any:
+    """Convert a cell value into a json serializable value."""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if hasattr(value, "item"):
+        # numpy scalars
+        return value.item()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def format_rows(rows: Sequence[int], total: int) -> str:
+    """Format the excel row numbers, the rows beyond the listed ones are only counted."""
+    text = ", ".join(str(row) for row in rows)
+    if total > len(rows):
+        text = text + f", ... ({total} in total)"
+    return text
+
+
+def iter_text_lines(issues: Iterable[Issue], prefix: str) -> Iterator[str]:
+    """Yield one line per message, the rows of consecutive cell issues are merged."""
+    for _, group in groupby(
+        issues, key=lambda issue: (issue.sheet, issue.column, issue.rule, issue.message)
+    ):
+        rows = []
+        total = 0
+        # value -> suggestion, as many as the listed rows
+        suggestions: Dict[Any, Any] = {}
+        for issue in group:
+            message = issue.message
+            if issue.row is not None:
+                total += 1
+                if len(rows) < ROWS_LIMIT:
+                    rows.append(issue.row)
+            if issue.suggestion is not None and len(suggestions) < ROWS_LIMIT:
+                suggestions.setdefault(issue.value, issue.suggestion)
+
+        hint = ""
+        if suggestions:
+            pairs = ", ".join(f"{value} -> {option}" for value, option in suggestions.items())
+            hint = f", did you mean: {pairs}"
+
+        if total:
+            yield f"{prefix}: {message} (rows: {format_rows(rows, total)}{hint})\n"
+        else:
+            yield f"{prefix}: {message}\n"
+
+
+def write_jsonl(issues: Iterable[Issue], fp: IO[str]) -> None:
+    for issue in issues:
+        fp.write(json.dumps(issue._asdict()))
+        fp.write("\n")
+
+
+def write_json(issues: Iterable[Issue], fp: IO[str]) -> None:
+    # Written record by record, the whole array is never held in memory
+    fp.write("[")
+    for i, issue in enumerate(issues):
+        fp.write(",\n" if i else "\n")
+        fp.write(json.dumps(issue._asdict()))
+    fp.write("\n]\n")
@@ -0,0 +1,129 @@
+"""Vectorized column rules.
+
+Every rule works on a whole column at once and returns a boolean violation
+mask aligned with the values it received, ``True`` marks a failed cell.
+"""
+import numpy as np
+import pandas as pd
+from typing import Iterator, Tuple
+from .booleans import parse_booleans
+from .dates import parse_date, parse_dates
+from .specs.spec import ColumnSpec, OptionIndex, Type, option_index
+
+
+def regex_violations(values: pd.Series, regex) -> pd.Series:
+    matched = values.astype("string").str.fullmatch(regex)
+    return ~matched.fillna(False).astype(bool)
+
+
+def numeric_violations(numeric: pd.Series) -> pd.Series:
+    # pd.to_numeric(errors="coerce") turns every non-numeric value into NaN
+    return numeric.isnull()
+
+
+def min_violations(numeric: pd.Series, minimum) -> pd.Series:
+    # NaN compares as False, so non-numeric values are only reported once
+    return numeric < minimum
+
+
+def max_violations(numeric: pd.Series, maximum) -> pd.Series:
+    return numeric > maximum
+
+
+def date_violations(dates: np.ndarray, index: pd.Index) -> pd.Series:
+    # parse_dates turns every value which is not a date into NaT
+    return pd.Series(np.isnat(dates), index=index)
+
+
+def boolean_violations(values: pd.Series) -> pd.Series:
+    _, valid = parse_booleans(values)
+    return pd.Series(~valid, index=values.index)
+
+
+def options_violations(values: pd.Series, options: OptionIndex) -> pd.Series:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # One lookup per distinct value, then a take on the codes
+        valid = np.fromiter(
+            (category in options.values for category in values.cat.categories),
+            dtype=bool,
+            count=len(values.cat.categories),
+        )
+        return pd.Series(~valid[values.cat.codes.to_numpy()], index=values.index)
+    return ~values.isin(options.options)
+
+
+def column_violations(
+    column_spec: ColumnSpec, values: pd.Series
+) -> Iterator[Tuple[str, str, pd.Series]]:
+    """Yield (rule id, message, violation mask) for each rule of the column.
+
+    The values must not contain nulls. Masks are computed lazily, so the caller
+    can stop at the first failing rule without paying for the others.
+    """
+    name = column_spec.name
+    if column_spec.type == Type.TEXT:
+        if column_spec.regex is not None:
+            pattern = getattr(column_spec.regex, "pattern", column_spec.regex)
+            yield (
+                "regex",
+                f"{name} has values that do not match {pattern}",
+                regex_violations(values, column_spec.regex),
+            )
+
+    elif column_spec.type in (Type.NUMBER, Type.FLOAT):
+        numeric = pd.to_numeric(values, errors="coerce")
+        yield "number", f"{name} has non-numeric values", numeric_violations(numeric)
+
+        if column_spec.min is not None:
+            yield (
+                "min",
+                f"{name} has values less than {column_spec.min}",
+                min_violations(numeric, column_spec.min),
+            )
+
+        if column_spec.max is not None:
+            yield (
+                "max",
+                f"{name} has values greater than {column_spec.max}",
+                max_violations(numeric, column_spec.max),
+            )
+
+    elif column_spec.type == Type.DATE:
+        dates = parse_dates(values)
+        yield (
+            "date",
+            f"{name} has values which are not dates (YYYYMMDD, YYYY-MM-DD or an excel date)",
+            date_violations(dates, values.index),
+        )
+
+        # NaT compares as False, the values which are not dates are only reported once
+        if column_spec.min is not None:
+            minimum = parse_date(column_spec.min)
+            yield (
+                "min",
+                f"{name} has dates before {minimum}",
+                pd.Series(dates < minimum, index=values.index),
+            )
+
+        if column_spec.max is not None:
+            maximum = parse_date(column_spec.max)
+            yield (
+                "max",
+                f"{name} has dates after {maximum}",
+                pd.Series(dates > maximum, index=values.index),
+            )
+
+    elif column_spec.type == Type.BOOLEAN:
+        yield (
+            "boolean",
+            f"{name} has values which are not booleans (TRUE/FALSE, Yes/No, Y/N or 1/0)",
+            boolean_violations(values),
+        )
+
+    elif column_spec.type == Type.CATEGORY:
+        if column_spec.options:
+            yield (
+                "options",
+                f"{name} has values not in {list(column_spec.options)}",
+                options_violations(values, option_index(column_spec)),
+            )
@@ -0,0 +1,335 @@
+"""A long running validation service.
+
+The specs are compiled once and a pool of worker processes stays warm (pandas,
+openpyxl and the validation plans are already imported and built), so a request
+only pays for the validation itself. The service speaks HTTP over a TCP port or a
+unix socket:
+
+    GET  /health                      the template types, workers and free slots
+    POST /validate?template_type=X    validate the uploaded file (the request body)
+    POST /validate?template_type=X&path=/data/file.xlsx
+                                      validate a file of one of the allowed roots
+
+`filename` (its extension picks the reader of an upload), `input_format`,
+`max_errors` and `fail_fast` are optional query parameters. The response is a
+json object with the counts and the issues of `Issue`.
+"""
+import os
+import json
+import stat
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from .specs import spec_dict
+from .readers import READERS
+from .report import ERROR
+from .validator import validator_dict
+
+TEMPLATE_TYPES = [name for name, validator in validator_dict.items() if validator]
+
+# The largest upload which is accepted, in bytes
+MAX_UPLOAD_SIZE = 256 * 1024 * 1024
+
+
+class ServiceError(Exception):
+    """A request which can't be served, status is the HTTP status code."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _init_worker() -> None:
+    # Import everything and compile every spec before the first request
+    for template_type in TEMPLATE_TYPES:
+        spec_dict[template_type]().plan
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def run_validation(
+    filepath: str,
+    template_type: str,
+    input_format: Optional[str] = None,
+    max_errors: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Validate one file in a worker, returns the json result of the request."""
+    validator = validator_dict[template_type](
+        filepath, input_format=input_format, max_errors=max_errors
+    )
+    validator.validate()
+    issues = [issue._asdict() for issue in validator.iter_issues()]
+    errors = sum(1 for issue in issues if issue["severity"] == ERROR)
+    return {
+        "template_type": template_type,
+        "valid": errors == 0,
+        "errors": errors,
+        "warnings": len(issues) - errors,
+        "stopped_early": validator.stopped_early,
+        "issues": issues,
+    }
+
+
+class ValidationService:
+    """The worker pool and the concurrency limit, shared by all the connections.
+
+    At most `concurrency` validations are in flight, the requests beyond it are
+    refused (503) instead of queueing without bound. File paths are only accepted
+    inside one of the `roots` directories, without roots only uploads are accepted.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        roots: Sequence[Union[str, Path]] = (),
+    ) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.concurrency = concurrency or self.workers
+        if self.workers <= 0 or self.concurrency <= 0:
+            raise ValueError("workers and concurrency must be positive integers.")
+
+        self.roots = [Path(root).resolve() for root in roots]
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        """Start the workers and wait until all of them are warm."""
+        _init_worker()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker
+        )
+        futures = [self._executor.submit(_ping) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def free_slots(self) -> int:
+        return self.concurrency - self._in_flight
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "template_types": TEMPLATE_TYPES,
+            "workers": self.workers,
+            "concurrency": self.concurrency,
+            "free_slots": self.free_slots,
+        }
+
+    def resolve_path(self, path: str) -> Path:
+        """Check that the path is a file or a directory inside an allowed root."""
+        if not self.roots:
+            raise ServiceError(403, "File paths are not accepted, upload the file.")
+
+        resolved = Path(path).resolve()
+        if not any(resolved.is_relative_to(root) for root in self.roots):
+            raise ServiceError(403, f"{path} is outside of the allowed directories.")
+        if not resolved.exists():
+            raise ServiceError(404, f"{path} not found.")
+        return resolved
+
+    def validate(
+        self,
+        filepath: Union[str, Path],
+        template_type: str,
+        input_format: Optional[str] = None,
+        max_errors: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Validate a file on a warm worker, raise ServiceError(503) when all slots are taken."""
+        if template_type not in TEMPLATE_TYPES:
+            raise ServiceError(
+                400,
+                f"The template type {template_type} is not supported, please choose one of {TEMPLATE_TYPES}.",
+            )
+        if input_format is not None and input_format not in READERS:
+            raise ServiceError(
+                400,
+                f"Unknown input format {input_format}, please choose one of {list(READERS)}.",
+            )
+        if self._executor is None:
+            raise RuntimeError("The service is not started.")
+
+        if not self._slots.acquire(blocking=False):
+            raise ServiceError(503, "Too many validations in progress, retry later.")
+        with self._lock:
+            self._in_flight += 1
+
+        try:
+            future = self._executor.submit(
+                run_validation, str(filepath), template_type, input_format, max_errors
+            )
+            result = future.result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+        return result
+
+
+def _first(query: Dict[str, List[str]], name: str) -> Optional[str]:
+    values = query.get(name)
+    return values[0] if values else None
+
+
+class ValidationHandler(BaseHTTPRequestHandler):
+    server_version = "metav"
+
+    @property
+    def service(self) -> ValidationService:
+        return self.server.service
+
+    def address_string(self) -> str:
+        # The client address of a unix socket is an empty string
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "unix"
+
+    def log_message(self, format: str, *args) -> None:
+        if not getattr(self.server, "quiet", False):
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 503:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if urlparse(self.path).path == "/health":
+            self._send_json(200, self.service.health())
+        else:
+            self._send_json(404, {"error": f"{self.path} not found."})
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        if url.path != "/validate":
+            self._send_json(404, {"error": f"{url.path} not found."})
+            return
+
+        try:
+            result = self._validate(parse_qs(url.query))
+        except ServiceError as e:
+            self._send_json(e.status, {"error": str(e)})
+        except Exception as e:
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+        else:
+            self._send_json(200, result)
+
+    def _validate(self, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        template_type = _first(query, "template_type")
+        if not template_type:
+            raise ServiceError(400, "The template_type parameter is required.")
+
+        input_format = _first(query, "input_format")
+        max_errors = _first(query, "max_errors")
+        try:
+            max_errors = int(max_errors) if max_errors else None
+        except ValueError:
+            max_errors = 0
+        if max_errors is not None and max_errors <= 0:
+            raise ServiceError(400, "max_errors must be a positive integer.")
+        if _first(query, "fail_fast") in ("1", "true"):
+            max_errors = 1
+
+        path = _first(query, "path")
+        if path:
+            filepath = self.service.resolve_path(path)
+            result = self.service.validate(
+                filepath, template_type, input_format, max_errors
+            )
+            result["file"] = path
+            return result
+
+        # The upload is written to a temporary file, it is read by the worker
+        filename = os.path.basename(_first(query, "filename") or "")
+        if not filename:
+            reader = READERS.get(input_format or "excel", READERS["excel"])
+            filename = f"upload{reader.extensions[0]}"
+
+        tmpdir = tempfile.mkdtemp(prefix="metav-")
+        try:
+            filepath = Path(tmpdir) / filename
+            self._save_upload(filepath)
+            result = self.service.validate(
+                filepath, template_type, input_format, max_errors
+            )
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        result["file"] = filename
+        return result
+
+    def _save_upload(self, filepath: Path) -> None:
+        length = self.headers.get("Content-Length")
+        if length is None:
+            raise ServiceError(411, "The Content-Length header is required.")
+        length = int(length)
+        if length <= 0:
+            raise ServiceError(400, "The request body is empty, upload a file or give a path.")
+        if length > MAX_UPLOAD_SIZE:
+            raise ServiceError(413, f"The upload is larger than {MAX_UPLOAD_SIZE} bytes.")
+
+        with open(filepath, "wb") as f:
+            remaining = length
+            while remaining:
+                data = self.rfile.read(min(remaining, 1024 * 1024))
+                if not data:
+                    raise ServiceError(400, "The upload is truncated.")
+                f.write(data)
+                remaining -= len(data)
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(
+    service: ValidationService,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: Optional[str] = None,
+    quiet: bool = False,
+):
+    """Create the HTTP server of the service, on a unix socket when socket_path is given."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            # Only the socket left by a previous run is removed, never another file
+            if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                raise FileExistsError(f"{socket_path} exists and is not a socket.")
+            os.unlink(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, ValidationHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ValidationHandler)
+        server.daemon_threads = True
+
+    server.service = service
+    server.quiet = quiet
+    return server
@@ -2,7 +2,7 @@ from .dnaseq_spec import DNAseqSpec
 from .rnaseq_spec import RNAseqSpec
 from .metabolomics_spec import MetabolomicsSpec
 
-from .spec import ExpectedColumnItem
+from .spec import ExpectedColumnItem, CompiledColumn, ValidationPlan, SheetLink
 
 spec_dict = {
     "DNAseq": DNAseqSpec,
@@ -16,5 +16,8 @@ __all__ = [
     "RNAseqSpec",
     "MetabolomicsSpec",
     "ExpectedColumnItem",
+    "CompiledColumn",
+    "ValidationPlan",
+    "SheetLink",
     "spec_dict",
 ]
@@ -1,18 +1,22 @@
 import re
-from .spec import ExpectedColumnItem, Type, BaseSpec
+from .spec import ExpectedColumnItem, Type, BaseSpec, SheetLink
 from typing import Dict, List
 
 
 class DNAseqSpec(BaseSpec):
     @property
     def version(self):
-        return "20221128"
+        return "20261017"
 
     @property
     def description(self) -> str:
         return """"If you have any questions, please feel free to contact us at quartet@fudan.edu.cn.\nNOTE: This template table may change in the future as the specification is upgraded. You need to rename the excel file to metadata.xlsx before you uploading to Quartet Data Portal.
         """
 
+    @property
+    def links(self) -> List[SheetLink]:
+        return [SheetLink(column="library_id", sheets=("metadata", "quality_control"))]
+
     @property
     def specs(self) -> Dict[str, List[ExpectedColumnItem]]:
         return {
@@ -86,7 +90,7 @@ class DNAseqSpec(BaseSpec):
                 ExpectedColumnItem(
                     name="preparation_date",
                     required=True,
-                    type=Type.NUMBER,
+                    type=Type.DATE,
                     min=20150101,
                     max=20361231,
                     procedure="Library Info",
@@ -129,7 +133,7 @@ class DNAseqSpec(BaseSpec):
                 ExpectedColumnItem(
                     name="run_date",
                     required=True,
-                    type=Type.NUMBER,
+                    type=Type.DATE,
                     min=20150101,
                     max=20361231,
                     procedure="Sequencing Info",
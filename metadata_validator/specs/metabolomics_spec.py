@@ -6,7 +6,7 @@ from .spec import ExpectedColumnItem, BaseSpec, Type
 class MetabolomicsSpec(BaseSpec):
     @property
     def version(self) -> str:
-        return "2022070101"
+        return "2026101701"
 
     @property
     def description(self) -> str:
@@ -21,6 +21,7 @@ class MetabolomicsSpec(BaseSpec):
                     name="file_name",
                     required=True,
                     type=Type.TEXT,
+                    unique=True,
                     description="File Name",
                     procedure="Basic Info",
                     example="LabXXX_XXX_D5_1.csv",
@@ -107,7 +108,7 @@ class MetabolomicsSpec(BaseSpec):
                 ExpectedColumnItem(
                     name="prepare_date",
                     required=True,
-                    type=Type.NUMBER,
+                    type=Type.DATE,
                     min=20150101,
                     max=20361231,
                     procedure="Sample Preparation",
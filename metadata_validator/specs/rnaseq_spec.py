@@ -1,18 +1,22 @@
 import re
-from .spec import ExpectedColumnItem, Type, BaseSpec
+from .spec import ExpectedColumnItem, Type, BaseSpec, SheetLink
 from typing import Dict, List
 
 
 class RNAseqSpec(BaseSpec):
     @property
     def version(self) -> str:
-        return "2022051201"
+        return "2026101702"
 
     @property
     def description(self) -> str:
         return """"The template includes two worksheets: metadata and quality_control (Please don't rename these worksheets). If you have any questions, please feel free to contact us at quartet@fudan.edu.cn.\nNOTE: This template table may change in the future as the specification is upgraded. You need to rename the excel file to metadata.xlsx before you uploading to Quartet Data Portal.
         """
 
+    @property
+    def links(self) -> List[SheetLink]:
+        return [SheetLink(column="library_id", sheets=("metadata", "quality_control"))]
+
     @property
     def specs(self) -> Dict[str, List[ExpectedColumnItem]]:
         return {
@@ -21,6 +25,7 @@ class RNAseqSpec(BaseSpec):
                     name="file_name",
                     required=True,
                     type=Type.TEXT,
+                    unique=True,
                     procedure="Basic Info",
                     description="The name of the file, including the file extension. The file name should be unique within the project.",
                     example="FDU_ILM_D5_20200808_001_R1.fastq.gz",
@@ -160,7 +165,7 @@ class RNAseqSpec(BaseSpec):
                 ExpectedColumnItem(
                     name="enrichment_date",
                     required=True,
-                    type=Type.NUMBER,
+                    type=Type.DATE,
                     min=20150101,
                     max=20361231,
                     procedure="RNA Enrichments",
@@ -179,8 +184,7 @@ class RNAseqSpec(BaseSpec):
                 ExpectedColumnItem(
                     name="is_strand_specific",
                     required=True,
-                    type=Type.CATEGORY,
-                    options=["TRUE", "FALSE"],
+                    type=Type.BOOLEAN,
                     procedure="Library Preparation",
                     description="Whether the enrichment is strand specific.",
                     example="TRUE",
@@ -334,7 +338,7 @@ class RNAseqSpec(BaseSpec):
                 ExpectedColumnItem(
                     name="preparation_date",
                     required=True,
-                    type=Type.NUMBER,
+                    type=Type.DATE,
                     min=20150101,
                     max=20361231,
                     procedure="Library Preparation",
@@ -403,8 +407,7 @@ class RNAseqSpec(BaseSpec):
                 ExpectedColumnItem(
                     name="is_paired_end",
                     required=True,
-                    type=Type.CATEGORY,
-                    options=["TRUE", "FALSE"],
+                    type=Type.BOOLEAN,
                     procedure="Library Sequencing",
                     description="Whether the sequencing is paired-end.",
                     example="TRUE",
@@ -438,7 +441,7 @@ class RNAseqSpec(BaseSpec):
                 ExpectedColumnItem(
                     name="run_date",
                     required=True,
-                    type=Type.NUMBER,
+                    type=Type.DATE,
                     min=20150101,
                     max=20361231,
                     procedure="Library Sequencing",
@@ -451,6 +454,7 @@ class RNAseqSpec(BaseSpec):
                     name="library_id",
                     required=True,
                     type=Type.TEXT,
+                    unique=True,
                     procedure="RNA QC",
                     description="The unique identifier for the library. The library ID should be unique within the project.",
                     example="FDU_ILM_D5_20200808_001",
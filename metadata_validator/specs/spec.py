@@ -1,14 +1,26 @@
 import re
-import pandas as pd
 from pathlib import Path
-from openpyxl import Workbook
-from dataclasses import dataclass
-from openpyxl.styles.alignment import Alignment
-from typing import List, Union, Optional, Dict
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, Color, Border, Side, PatternFill
+from types import MappingProxyType
+from dataclasses import dataclass, fields
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    FrozenSet,
+    List,
+    Union,
+    Optional,
+    Dict,
+    Mapping,
+    Sequence,
+    Tuple,
+)
 from enum import Enum
 
+# openpyxl is only imported when a template is generated, the specs are also
+# loaded by commands which never write a workbook
+if TYPE_CHECKING:
+    from openpyxl import Workbook
+
 
 class Type(Enum):
     TEXT = "text"
@@ -16,6 +28,8 @@ class Type(Enum):
     FLOAT = "float"
     NUMBER = "number"
     BOOLEAN = "boolean"
+    # YYYYMMDD integers, ISO strings or excel dates, min and max are dates too
+    DATE = "date"
 
 
 @dataclass
@@ -30,6 +44,168 @@ class ExpectedColumnItem:
     max: Optional[Union[int, float]] = None
     description: Optional[str] = None
     example: Optional[Union[str, int, float]] = None
+    # The values must be unique within the sheet
+    unique: bool = False
+
+
+@dataclass(frozen=True)
+class SheetLink:
+    """Each value of the column in one sheet must exist in the other sheets."""
+
+    column: str
+    sheets: Tuple[str, ...]
+
+
+_NOT_ALPHANUMERIC = re.compile(r"[\W_]+")
+
+
+def _normalize(value: Any) -> str:
+    """The key of a value for the suggestions, case, spaces and punctuation are ignored."""
+    return _NOT_ALPHANUMERIC.sub("", str(value).strip().casefold())
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance of a and b, any distance above limit is returned as limit + 1."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other))
+            )
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class OptionIndex:
+    """The options of a category column, as a set and as an index of suggestions.
+
+    A value which is not an option is matched to an option by its normalized key
+    (`d5 1` and `D5-1` are `D5_1`), else to the closest key within an edit distance
+    of a third of its length.
+    """
+
+    __slots__ = ("options", "values", "_keys", "_by_length")
+
+    def __init__(self, options: Sequence[Any]) -> None:
+        self.options: Tuple[Any, ...] = tuple(options)
+        self.values: FrozenSet[Any] = frozenset(self.options)
+        self._keys: Dict[str, Any] = {}
+        # Keys grouped by length, only the lengths within the distance are compared
+        self._by_length: Dict[int, List[str]] = {}
+        for option in self.options:
+            key = _normalize(option)
+            if key not in self._keys:
+                self._keys[key] = option
+                self._by_length.setdefault(len(key), []).append(key)
+
+    def __contains__(self, value: Any) -> bool:
+        return value in self.values
+
+    def suggest(self, value: Any) -> Optional[Any]:
+        """The closest option of a value which is not an option, None if none is close."""
+        key = _normalize(value)
+        if not key:
+            return None
+        if key in self._keys:
+            return self._keys[key]
+
+        limit = max(1, len(key) // 3)
+        best, best_distance, tie = None, limit + 1, False
+        for length in range(len(key) - limit, len(key) + limit + 1):
+            for candidate in self._by_length.get(length, []):
+                distance = _edit_distance(key, candidate, limit)
+                if distance < best_distance:
+                    best, best_distance, tie = candidate, distance, False
+                elif distance == best_distance:
+                    tie = True
+        # Two options as close as each other, either could be the intended one
+        return None if best is None or tie else self._keys[best]
+
+
+class CompiledColumn:
+    """Immutable and precompiled copy of an ExpectedColumnItem."""
+
+    __slots__ = tuple(field.name for field in fields(ExpectedColumnItem)) + (
+        "option_index",
+    )
+
+    def __init__(self, item: ExpectedColumnItem) -> None:
+        for field in fields(ExpectedColumnItem):
+            object.__setattr__(self, field.name, getattr(item, field.name))
+
+        option_index = None
+        if self.options is not None:
+            object.__setattr__(self, "options", tuple(self.options))
+            option_index = OptionIndex(self.options)
+        object.__setattr__(self, "option_index", option_index)
+
+        if isinstance(self.regex, str):
+            object.__setattr__(self, "regex", re.compile(self.regex))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return f"CompiledColumn(name={self.name!r}, type={self.type})"
+
+
+ColumnSpec = Union[ExpectedColumnItem, CompiledColumn]
+
+
+def option_index(column_spec: ColumnSpec) -> Optional[OptionIndex]:
+    """The option index compiled with the column, built on the fly for a raw item."""
+    index = getattr(column_spec, "option_index", None)
+    if index is None and column_spec.options:
+        index = OptionIndex(column_spec.options)
+    return index
+
+
+class ValidationPlan:
+    """Immutable validation plan of a spec, compiled once per spec class and version.
+
+    Use `BaseSpec.plan` to get the cached plan instead of building it directly.
+    """
+
+    __slots__ = ("version", "description", "sheets", "colors", "links")
+
+    def __init__(self, spec: "BaseSpec") -> None:
+        specs = spec.specs
+        sheets = {
+            sheet: tuple(CompiledColumn(item) for item in items)
+            for sheet, items in specs.items()
+        }
+        colors = {
+            sheet: tuple(color) for sheet, color in spec._gen_colors(sheets).items()
+        }
+
+        object.__setattr__(self, "version", spec.version)
+        object.__setattr__(self, "description", spec.description)
+        object.__setattr__(self, "sheets", MappingProxyType(sheets))
+        object.__setattr__(self, "colors", MappingProxyType(colors))
+        object.__setattr__(self, "links", tuple(spec.links))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return list(self.sheets.keys())
+
+
+# Plans live for the whole process, keyed by (spec class, version)
+_plans: Dict[Tuple[type, str], ValidationPlan] = {}
 
 
 class BaseSpec:
@@ -48,6 +224,18 @@ class BaseSpec:
     def specs(self) -> Dict[str, List[ExpectedColumnItem]]:
         raise NotImplementedError
 
+    @property
+    def links(self) -> List[SheetLink]:
+        return []
+
+    @property
+    def plan(self) -> ValidationPlan:
+        key = (type(self), self.version)
+        plan = _plans.get(key)
+        if plan is None:
+            plan = _plans.setdefault(key, ValidationPlan(self))
+        return plan
+
     def _color_generator(self):
         """Yield color based on color map from https://colorbrewer2.org/#type=qualitative&scheme=Paired&n=9"""
         colors = [
@@ -67,14 +255,14 @@ class BaseSpec:
         for color in colors:
             yield color
 
-    def _gen_colors(self) -> Dict[str, List[str]]:
+    def _gen_colors(
+        self, specs: Mapping[str, Sequence[ColumnSpec]]
+    ) -> Dict[str, List[str]]:
         """Generate colors for each procedure"""
         colors = {}
-        for sheet in self.specs.keys():
+        for sheet, items in specs.items():
             procedures = [
-                item.procedure
-                for item in self.specs[sheet]
-                if item.procedure is not None
+                item.procedure for item in items if item.procedure is not None
             ]
 
             color_map = {}
@@ -87,24 +275,6 @@ class BaseSpec:
 
         return colors
 
-    def _auto_width(self, ws):
-        # 设置自动列宽
-        for column in ws.columns:
-            max_length = 0
-            column = [cell for cell in column]
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(cell.value)
-                except:
-                    pass
-            adjusted_width = (max_length + 2) * 1.2
-            ws.column_dimensions[
-                get_column_letter(column[0].column)
-            ].width = adjusted_width
-
-        return ws
-
     def _auto_height(self, ws):
         # 设置自动行高
         for row in ws.iter_rows():
@@ -121,98 +291,128 @@ class BaseSpec:
                     pass
             ws.row_dimensions[row[0].row].height = max_height
 
-    def _max_width(self, ws, max_width=45):
-        for column in ws.columns:
-            ws.column_dimensions[get_column_letter(column[0].column)].width = max_width
-
-    def _border(self, ws):
-        # 设置线框样式
-        border_style = Side(style="thin")
-        border = Border(
-            top=border_style, right=border_style, bottom=border_style, left=border_style
+    def _template_styles(self, wb) -> Dict[str, str]:
+        """Register the named styles of the template, shared by all the cells.
+
+        Returns the style name of each key: "cell", "title", "column" and one
+        "fill:<color>" per procedure color.
+        """
+        from openpyxl.styles import (
+            Alignment,
+            Border,
+            Color,
+            Font,
+            NamedStyle,
+            PatternFill,
+            Side,
         )
-        for row in ws.iter_rows():
-            for cell in row:
-                cell.border = border
+        from openpyxl.styles.fonts import DEFAULT_FONT
 
-    def _align(self, ws):
         alignment = Alignment(wrapText=True, vertical="center", horizontal="center")
-        for row in ws.iter_rows():
-            for cell in row:
-                cell.alignment = alignment
-
-    def generate_template(self, filepath: Path) -> Workbook:
-        wb = Workbook()
-        # Remove the default sheet
-        wb.remove(wb.active)  # type: ignore
-
-        ws = wb.create_sheet("Sheet1")
-
-        ws.title = "Please Read First!"
-        ws.merge_cells("A1:F1")  # type: ignore
-
-        # Set the color as red
-        font = Font(name="Arial", size=22, bold=True, color=Color(rgb="FF0000"))
-        ws["A1"] = "Please Read First (%s)" % self.version
-        ws["A1"].font = font
-
-        ws.merge_cells("A2:F3")
-        ws["A2"] = self.description
-
-        for sheet in self.specs.keys():
-            # Get current row number
-            row = ws.max_row + 2
-            ws.merge_cells("A%d:F%d" % (row, row))
-            ws["A%d" % row] = "Sheet - %s" % sheet.capitalize()
-
-            d = [
-                {
-                    "key": item.name,
-                    "description": item.description,
-                    "procedure": item.procedure,
-                    "type": item.type.value,
-                    "required": "Yes" if item.required else "No",
-                    "example": item.example,
-                }
-                for item in self.specs[sheet]
-            ]
-
-            keys = ["key", "description", "procedure", "type", "required", "example"]
-            # Write the column names (keys from the first dictionary) to the first row
-            current_row = ws.max_row + 1
-            for j, key in enumerate(keys, start=1):
-                ws.cell(row=current_row, column=j, value=key)
-
-            current_row = ws.max_row + 1
-            colors = self._gen_colors()
-            # Write the data from each dictionary to the following rows
-            for j, item in enumerate(d, start=current_row):  # start from the second row
-                color = colors[sheet][j - current_row]
-                fill = PatternFill(fgColor=Color(rgb=color), fill_type="lightGray")
-                for i, key in enumerate(item.keys(), start=1):
-                    cell = ws.cell(row=j, column=i, value=item[key])
-                    cell.fill = fill
-
-            # Add a blank row
-            ws.append([])
-
-        # ws = self._auto_width(ws)
-        # Set the max width for description column
-        self._max_width(ws, max_width=30)
-        self._align(ws)
-        self._border(ws)
+        side = Side(style="thin")
+        border = Border(top=side, right=side, bottom=side, left=side)
+
+        styles = {
+            "cell": NamedStyle(
+                "metav_cell", font=DEFAULT_FONT, alignment=alignment, border=border
+            ),
+            "title": NamedStyle(
+                "metav_title",
+                # Set the color as red
+                font=Font(name="Arial", size=22, bold=True, color=Color(rgb="FF0000")),
+                alignment=alignment,
+                border=border,
+            ),
+            "column": NamedStyle("metav_column", font=DEFAULT_FONT, alignment=alignment),
+        }
+        for colors in self.plan.colors.values():
+            for color in colors:
+                styles.setdefault(
+                    f"fill:{color}",
+                    NamedStyle(
+                        f"metav_fill_{color}",
+                        font=DEFAULT_FONT,
+                        fill=PatternFill(fgColor=Color(rgb=color), fill_type="lightGray"),
+                        alignment=alignment,
+                        border=border,
+                    ),
+                )
+
+        for style in styles.values():
+            wb.add_named_style(style)
+        return {key: style.name for key, style in styles.items()}
+
+    def generate_template(self, filepath: Path) -> "Workbook":
+        """Write the template, a readme sheet and one sheet per spec sheet.
+
+        The workbook is written in write-only mode, the rows are streamed into the
+        file and every cell refers to one of a few named styles.
+        """
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.utils import get_column_letter
+
+        plan = self.plan
+        wb = Workbook(write_only=True)
+        styles = self._template_styles(wb)
+
+        def styled_row(ws, values, style, width):
+            row = []
+            for i in range(width):
+                cell = WriteOnlyCell(ws, value=values[i] if i < len(values) else None)
+                cell.style = style
+                row.append(cell)
+            return row
+
+        ws = wb.create_sheet("Please Read First!")
+        keys = ["key", "description", "procedure", "type", "required", "example"]
+        width = len(keys)
+        last_column = get_column_letter(width)
+        for i in range(1, width + 1):
+            ws.column_dimensions[get_column_letter(i)].width = 30
+
+        ws.append(
+            styled_row(ws, ["Please Read First (%s)" % plan.version], styles["title"], width)
+        )
+        ws.append(styled_row(ws, [plan.description], styles["cell"], width))
+        ws.append(styled_row(ws, [], styles["cell"], width))
+        ws.merged_cells.add(f"A1:{last_column}1")
+        ws.merged_cells.add(f"A2:{last_column}3")
+
+        row = 3
+        for sheet, items in plan.sheets.items():
+            # A blank row, then the title of the sheet
+            ws.append(styled_row(ws, [], styles["cell"], width))
+            ws.append(
+                styled_row(ws, ["Sheet - %s" % sheet.capitalize()], styles["cell"], width)
+            )
+            row += 2
+            ws.merged_cells.add(f"A{row}:{last_column}{row}")
+
+            ws.append(styled_row(ws, keys, styles["cell"], width))
+            row += 1
+            for item, color in zip(items, plan.colors[sheet]):
+                values = [
+                    item.name,
+                    item.description,
+                    item.procedure,
+                    item.type.value,
+                    "Yes" if item.required else "No",
+                    item.example,
+                ]
+                ws.append(styled_row(ws, values, styles[f"fill:{color}"], width))
+                row += 1
 
         # Add a new worksheet
-        for sheet in self.specs.keys():
+        for sheet, items in plan.sheets.items():
             ws = wb.create_sheet(sheet)
-            columns = [item.name for item in self.specs[sheet]]
-            ws.append(columns)
-
-            examples = [item.example for item in self.specs[sheet]]
-            ws.append(examples)
+            for i in range(1, len(items) + 1):
+                ws.column_dimensions[get_column_letter(i)].width = 30
 
-            self._max_width(ws, max_width=30)
-            self._align(ws)
+            columns = [item.name for item in items]
+            examples = [item.example for item in items]
+            ws.append(styled_row(ws, columns, styles["column"], len(items)))
+            ws.append(styled_row(ws, examples, styles["column"], len(items)))
 
         # Write to file
         wb.save(filepath)
@@ -221,4 +421,4 @@ class BaseSpec:
 
     @property
     def sheet_names(self) -> List[str]:
-        return list(self.specs.keys())
+        return self.plan.sheet_names
@@ -1,27 +1,219 @@
-import re
 import pandas as pd
-from typing import List, Dict, Tuple
+from typing import IO, Any, List, Dict, Set, Tuple, Mapping, Sequence, Iterator, Optional, Union
 from pathlib import Path
+from contextlib import nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor
 from .specs import (
-    ExpectedColumnItem,
     RNAseqSpec,
     DNAseqSpec,
     MetabolomicsSpec,
 )
+from .specs.spec import ColumnSpec, SheetLink, option_index
+from .rules import column_violations
+from .cache import ChecksumCache, ResultCache
+from .checksum import FileRecord, verify_files
+from .dtypes import spec_dtypes
+from .readers import BaseReader, get_reader
+from .profiling import OPEN, Profiler, ProfilePath, Stat
+from .keyindex import KeyIndex
+from .export import DEFAULT_BATCH_SIZE, BaseWriter, get_writer, normalize_frame
+from .report import (
+    ERROR,
+    WARNING,
+    Issue,
+    to_builtin,
+    iter_text_lines,
+    write_json,
+    write_jsonl,
+)
+
+
+class _ColumnResult:
+    """Results of the column rules, merged across the chunks of a sheet."""
+
+    __slots__ = ("rows", "nulls", "violations")
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.nulls = 0
+        # rule id -> [message, failed excel row numbers, failed values]
+        self.violations: Dict[str, List[Any]] = {}
+
+    def update(
+        self,
+        column_spec: ColumnSpec,
+        column: pd.Series,
+        limit: float = float("inf"),
+        profiler: Optional[Profiler] = None,
+        path: ProfilePath = (),
+    ) -> int:
+        """Run the rules on a chunk of the column, return the number of failed cells kept.
+
+        At most `limit` failed cells are kept, the rules are not run anymore once
+        the limit is reached. With a profiler, each rule is timed under path.
+        """
+        # One null mask per column, shared by every check below
+        null = column.isnull()
+        self.rows += len(column)
+        self.nulls += int(null.sum())
+
+        # Remove null values, they may cause problems when validating the type
+        values = column[~null]
+        kept = 0
+        if values.empty:
+            return kept
+
+        rules = column_violations(column_spec, values)
+        if profiler is not None:
+            rules = profiler.iter_rules(path, rules, len(values))
+
+        for rule_id, msg, mask in rules:
+            if kept >= limit:
+                break
+
+            violation = self.violations.setdefault(rule_id, [msg, [], []])
+            if mask.any():
+                failed = values[mask.to_numpy()]
+                if len(failed) > limit - kept:
+                    failed = failed.iloc[: int(limit - kept)]
+                violation[1].extend((failed.index + 2).tolist())
+                violation[2].extend(failed.tolist())
+                kept += len(failed)
+
+        return kept
+
+
+def _suggestions(column_spec: ColumnSpec, values: Sequence[Any]) -> Dict[Any, Any]:
+    """The closest option of each distinct value which is not an option."""
+    index = option_index(column_spec)
+    return {value: index.suggest(value) for value in set(values)}
 
 
 class MetadataValidator:
     def __init__(
         self,
         filepath: Path,
-        specs: Dict[str, List[ExpectedColumnItem]],
+        specs: Mapping[str, Sequence[ColumnSpec]],
         sheet_names: List[str] = ["metadata", "quality_control"],
+        chunk_size: Optional[int] = None,
+        links: Sequence[SheetLink] = (),
+        cache: Optional[ResultCache] = None,
+        spec_id: Optional[str] = None,
+        input_format: Optional[str] = None,
+        max_errors: Optional[int] = None,
+        max_sheet_errors: Optional[int] = None,
+        fail_fast: bool = False,
+        profiler: Optional[Profiler] = None,
+        key_index: Optional[KeyIndex] = None,
+        submission: Optional[str] = None,
+        column_workers: Optional[int] = None,
+        data_dir: Optional[Path] = None,
+        hash_workers: int = 8,
+        checksum_cache: Optional[ChecksumCache] = None,
     ) -> None:
+        """Validate the sheets of an excel file against the specs.
+
+        Other formats (csv, tsv, parquet, arrow) are read by the backends of
+        `readers`, the input_format is detected from the file extension by default.
+
+        If chunk_size is set, the sheets are not loaded into memory. The rows are
+        streamed from the file and validated chunk_size rows at a time, so the
+        memory usage does not depend on the number of rows, but `metadata` stays
+        empty.
+
+        If a cache is given, spec_id must identify the specs (e.g. the spec class and
+        its version). When the same file was already validated with the same specs,
+        the stored results are used, the file isn't parsed and `cached` is True.
+
+        max_errors and max_sheet_errors are error budgets for the whole file and for
+        each sheet, fail_fast is the same as max_errors=1. Once a budget is used up,
+        the validation stops: no other sheet is read and no other rule is run for
+        the whole file or for the sheet, and `stopped_early` is True. The result cache
+        is not used with a budget.
+
+        If a profiler is given, the reading and every check are timed into it by
+        stage, sheet, column and rule. The result cache is not used then.
+
+        If a key index is given, the values of the unique columns are checked against
+        the other submissions of the project. A file without errors is then
+        registered in it under submission (the resolved path of the file by
+        default), a file with errors is not registered, nor checked once its error
+        budget is used up. The result cache is not used then, the
+        collisions depend on the content of the index.
+
+        If column_workers is more than 1, the column rules of the sheets run on a
+        pool of that many threads, the report is the same as the one of a serial
+        run. The error budgets need the columns in their order, the rules run
+        serially with them.
+
+        If a data_dir is given, `validate` also checks the data files of the sheets
+        (see `verify_files`) with hash_workers threads and the checksum_cache, before
+        the key index, so a file whose data files are missing or corrupted is not
+        registered. The result cache is not used then, the data files may change.
+        """
+        if chunk_size is not None and chunk_size <= 0:
+            raise ValueError("chunk_size must be a positive integer.")
+        if fail_fast:
+            max_errors = 1
+        for budget in (max_errors, max_sheet_errors):
+            if budget is not None and budget <= 0:
+                raise ValueError("The error budgets must be positive integers.")
+        if column_workers is not None and column_workers <= 0:
+            raise ValueError("column_workers must be a positive integer.")
+
         self.file_path: Path = filepath
         self.raw_sheet_names: List[str] = sheet_names
-        self._errors: Dict[str, List[str]] = {}
-        self._warnings: Dict[str, List[str]] = {}
+        self.chunk_size: Optional[int] = chunk_size
+        self.input_format: Optional[str] = input_format
+        self.column_workers = column_workers
+        self.data_dir = data_dir
+        self.hash_workers = hash_workers
+        self._checksum_cache = checksum_cache
+        self._errors: Dict[str, List[Issue]] = {}
+        self._warnings: Dict[str, List[Issue]] = {}
         self._specs = specs
+        self._links = links
+        # The dtypes of the columns of each sheet, the readers convert them
+        self._dtypes = {
+            sheet_name: spec_dtypes(column_specs)
+            for sheet_name, column_specs in specs.items()
+        }
+        self.max_errors = max_errors
+        self.max_sheet_errors = max_sheet_errors
+        self.stopped_early = False
+        self._error_count = 0
+        self._sheet_error_counts: Dict[str, int] = {}
+        self._stopped_sheets: Set[str] = set()
+        self._reader: Optional[BaseReader] = None
+        self._profiler = profiler
+        self._key_index = key_index
+        # Files of different directories may have the same name, e.g. */metadata.xlsx
+        self.submission = submission or str(Path(filepath).resolve())
+        # A partial result must not be cached, nor served instead of one
+        if max_errors is not None or max_sheet_errors is not None:
+            cache = None
+        # A cached result would leave nothing to profile
+        if profiler is not None or key_index is not None:
+            cache = None
+        if data_dir is not None:
+            cache = None
+        self._cache = cache
+        self._cache_key: Optional[str] = None
+        self.cached = False
+        self.validated = False
+
+        if cache is not None:
+            if not spec_id:
+                raise ValueError("spec_id is required when the result cache is used.")
+
+            self._cache_key = cache.key(filepath, spec_id)
+            result = cache.get(self._cache_key)
+            if result is not None and "issues" in result:
+                for record in result["issues"]:
+                    self._add_issue(Issue(*record))
+                self._metadata, self.sheet_names = {}, result["sheet_names"]
+                self.cached = True
+                return
 
         if specs:
             for sheet_name in self.raw_sheet_names:
@@ -29,209 +221,747 @@ class MetadataValidator:
                     self._add_warning(
                         sheet_name,
                         f"Sheet name {sheet_name} not found in specs, skipping validation for this sheet.",
+                        rule="sheet",
                     )
 
         # Maybe the sheet don't exist in the excel file, so we need to reset the sheet_names
         self._metadata, self.sheet_names = self._read_excel()
 
     @property
-    def errors(self):
-        msgs = []
-        for sheet_name in self.raw_sheet_names:
-            msg = f"Check Sheet {sheet_name} with errors:\n"
-            error_msg = "\n".join(
-                [f"Error: {e}" for e in self._errors.get(sheet_name, [])]
-            )
+    def errors(self) -> str:
+        return "".join(self.iter_text(ERROR))
 
-            if error_msg:
-                msg = msg + error_msg + "\n"
-            else:
-                msg = msg + "No errors found." + "\n"
+    @property
+    def warnings(self) -> str:
+        return "".join(self.iter_text(WARNING))
 
-            msgs.append(msg)
+    def iter_text(self, severity: str = ERROR) -> Iterator[str]:
+        """Yield the text report of the errors or the warnings piece by piece."""
+        if severity == ERROR:
+            issues, title, prefix = self._errors, "errors", "Error"
+        else:
+            issues, title, prefix = self._warnings, "warnings", "Warning"
 
-        return "\n".join(msgs)
+        for i, sheet_name in enumerate(self.raw_sheet_names):
+            if i:
+                yield "\n"
+            yield f"Check Sheet {sheet_name} with {title}:\n"
 
-    @property
-    def warnings(self):
-        msgs = []
-        for sheet_name in self.raw_sheet_names:
-            msg = f"Check Sheet {sheet_name} with warnings:\n"
-            warn_msg = "\n".join(
-                [f"Warning: {e}" for e in self._warnings.get(sheet_name, [])]
-            )
-
-            if warn_msg:
-                msg = msg + warn_msg + "\n"
+            sheet_issues = issues.get(sheet_name)
+            if sheet_issues:
+                yield from iter_text_lines(sheet_issues, prefix)
             else:
-                msg = msg + "No warnings found." + "\n"
+                yield f"No {title} found.\n"
 
-            msgs.append(msg)
+    @property
+    def has_errors(self) -> bool:
+        return any(self._errors.values())
 
-        return "\n".join(msgs)
+    def iter_issues(self) -> Iterator[Issue]:
+        """Yield all errors, then all warnings, sheet by sheet."""
+        for issues in (self._errors, self._warnings):
+            for sheet_name in self.raw_sheet_names:
+                yield from issues.get(sheet_name, [])
+
+    def write_report(self, fp: IO[str], format: str = "text") -> None:
+        """Write the errors and the warnings as text, json or jsonl (one issue per line)."""
+        if format == "text":
+            fp.writelines(self.iter_text(ERROR))
+            fp.write("\n")
+            fp.writelines(self.iter_text(WARNING))
+        elif format == "json":
+            write_json(self.iter_issues(), fp)
+        elif format == "jsonl":
+            write_jsonl(self.iter_issues(), fp)
+        else:
+            raise ValueError(f"Unknown report format {format}.")
 
     @property
     def metadata(self) -> Dict[str, pd.DataFrame]:
+        """The sheets as DataFrames, they are read on the first access."""
+        if not self.chunk_size and not self.cached:
+            for sheet_name in list(self.sheet_names):
+                self._load_sheet(sheet_name)
         return self._metadata
 
+    def _measure(self, path: ProfilePath, rows: int = 0):
+        """Time a block into the profiler, a no-op context without one."""
+        if self._profiler is None:
+            # A Stat of its own, the columns may be checked on several threads
+            return nullcontext(Stat())
+        return self._profiler.measure(path, rows)
+
+    def _open_reader(self) -> BaseReader:
+        return get_reader(self.file_path, self.raw_sheet_names, self.input_format)
+
+    def _load_sheet(self, sheet_name: str) -> Optional[pd.DataFrame]:
+        """Read a sheet once and keep it, a sheet which can't be read is removed from sheet_names."""
+        if sheet_name in self._metadata:
+            return self._metadata[sheet_name]
+
+        if self._reader is None:
+            self._reader = self._open_reader()
+
+        try:
+            with self._measure(("read", sheet_name)) as counts:
+                self._metadata[sheet_name] = self._reader.read(
+                    sheet_name, dtypes=self._dtypes.get(sheet_name)
+                )
+                counts.rows = len(self._metadata[sheet_name])
+        except Exception as e:
+            msg = f"Reading {self._reader.name} file {sheet_name}, but {e}, please check the file format."
+            self._add_error(sheet_name, msg, rule="read")
+            self.sheet_names.remove(sheet_name)
+            return None
+
+        if len(self._metadata) == len(self.sheet_names):
+            # Every sheet is in memory, the file is not needed anymore
+            self._close_reader()
+
+        return self._metadata[sheet_name]
+
+    def _close_reader(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
     def _read_excel(self) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+        """Find the sheets of the input file through its reader backend.
+
+        The sheets are only read when they are validated (see `_load_sheet`), so a
+        validation which stops early doesn't parse the remaining sheets.
+        """
         metadata: Dict[str, pd.DataFrame] = {}
         sheet_names: List[str] = []
+
+        try:
+            with self._measure(("read", OPEN)):
+                reader = self._open_reader()
+                existing = reader.sheet_names
+        except Exception as e:
+            for sheet_name in self.raw_sheet_names:
+                msg = f"Reading file {sheet_name}, but {e}, please check the file format."
+                self._add_error(sheet_name, msg, rule="read")
+            return metadata, sheet_names
+
         for sheet_name in self.raw_sheet_names:
-            try:
-                metadata[sheet_name] = pd.read_excel(
-                    self.file_path, sheet_name=sheet_name
-                )
+            if sheet_name in existing:
                 sheet_names.append(sheet_name)
-            except Exception as e:
-                msg = f"Reading excel file {sheet_name}, but {e}, please check the file format."
-                self._add_error(sheet_name, msg)
+            else:
+                msg = f"Reading {reader.name} file {sheet_name}, but sheet named '{sheet_name}' not found, please check the file format."
+                self._add_error(sheet_name, msg, rule="read")
+
+        if self.chunk_size or not sheet_names:
+            reader.close()
+        else:
+            # Keep the file open, the sheets are read from it later
+            self._reader = reader
         return metadata, sheet_names
 
+    def _iter_frames(
+        self, sheet_name: str, columns: Optional[Sequence[str]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """Yield the rows of a sheet as DataFrames.
+
+        The index of the DataFrames is the row position in the sheet, so index + 2
+        is always the row number. At least one frame is yielded, even when the sheet
+        has no rows. In streaming mode only the given columns are read if the
+        backend supports it, the sheets loaded in memory are yielded as they are.
+        """
+        if not self.chunk_size:
+            frame = self._load_sheet(sheet_name)
+            if frame is not None:
+                yield frame
+            return
+
+        with self._open_reader() as reader:
+            chunks = reader.iter_chunks(
+                sheet_name, self.chunk_size, columns, self._dtypes.get(sheet_name)
+            )
+            if self._profiler is not None:
+                chunks = self._profiler.iter_frames(("read", sheet_name), chunks)
+            yield from chunks
+
     def validate(self):
-        raise NotImplementedError
+        if self.cached:
+            self.validated = True
+            return
 
-    def _add_error(self, sheet_name, error) -> None:
-        if sheet_name not in self._errors.keys():
-            self._errors[sheet_name] = [error]
-        else:
-            self._errors[sheet_name].append(error)
+        try:
+            self._validate_columns()
+            indexes = self._validate_rows()
+            if self.data_dir is not None:
+                self.verify_files(self.data_dir, self.hash_workers, self._checksum_cache)
+            # Last, only a file without any error is registered
+            if self._key_index is not None and not self._out_of_budget():
+                self._check_project_keys(indexes)
+        finally:
+            self._close_reader()
+        self.validated = True
+
+        if self._cache is not None and self._cache_key:
+            self._cache.set(
+                self._cache_key,
+                {
+                    "issues": [list(issue) for issue in self.iter_issues()],
+                    "sheet_names": self.sheet_names,
+                },
+            )
+
+    def _remaining(self, sheet_name: str) -> float:
+        """How many errors can still be reported for the sheet."""
+        remaining = float("inf")
+        if self.max_errors is not None:
+            remaining = self.max_errors - self._error_count
+        if self.max_sheet_errors is not None:
+            remaining = min(
+                remaining,
+                self.max_sheet_errors - self._sheet_error_counts.get(sheet_name, 0),
+            )
+        return remaining
+
+    def _out_of_budget(self) -> bool:
+        """Whether the error budget of the whole file is used up."""
+        return self.max_errors is not None and self._error_count >= self.max_errors
+
+    def _stop(self, sheet_name: str) -> None:
+        """Record that checks of the sheet were skipped, warn once per sheet."""
+        self.stopped_early = True
+        if sheet_name not in self._stopped_sheets:
+            self._stopped_sheets.add(sheet_name)
+            self._add_warning(
+                sheet_name,
+                f"Validation stopped after {self._error_count} errors, the remaining checks were skipped.",
+                rule="stopped",
+            )
 
-    def _add_warning(self, sheet_name, warning) -> None:
-        if sheet_name not in self._warnings.keys():
-            self._warnings[sheet_name] = [warning]
+    def _should_stop(self, sheet_name: str) -> bool:
+        """Check the error budgets before doing more work on the sheet."""
+        if self._remaining(sheet_name) > 0:
+            return False
+
+        self._stop(sheet_name)
+        return True
+
+    def _add_issue(self, issue: Issue) -> None:
+        if issue.severity == ERROR:
+            if self._remaining(issue.sheet) <= 0:
+                self._stop(issue.sheet)
+                return
+            self._error_count += 1
+            self._sheet_error_counts[issue.sheet] = (
+                self._sheet_error_counts.get(issue.sheet, 0) + 1
+            )
+
+        issues = self._errors if issue.severity == ERROR else self._warnings
+        if issue.sheet not in issues.keys():
+            issues[issue.sheet] = [issue]
         else:
-            self._warnings[sheet_name].append(warning)
+            issues[issue.sheet].append(issue)
+
+    def _add_error(
+        self,
+        sheet_name: str,
+        error: str,
+        column: Optional[str] = None,
+        row: Optional[int] = None,
+        rule: str = "",
+        value: Any = None,
+    ) -> None:
+        self._add_issue(
+            Issue(ERROR, sheet_name, column, row, rule, to_builtin(value), error)
+        )
+
+    def _add_warning(
+        self,
+        sheet_name: str,
+        warning: str,
+        column: Optional[str] = None,
+        row: Optional[int] = None,
+        rule: str = "",
+        value: Any = None,
+    ) -> None:
+        self._add_issue(
+            Issue(WARNING, sheet_name, column, row, rule, to_builtin(value), warning)
+        )
 
     def _validate_columns(self) -> None:
         if not self._specs:
             return
 
-        for sheet_name in self.sheet_names:
-            missing_columns: List[str] = []
-            wrong_type_columns: List[Dict[str, str]] = []
+        # With an error budget the columns spend it one after the other, in their order
+        parallel = (
+            self.column_workers is not None
+            and self.column_workers > 1
+            and self.max_errors is None
+            and self.max_sheet_errors is None
+        )
+        if not parallel:
+            for sheet_name in list(self.sheet_names):
+                if self._should_stop(sheet_name):
+                    if self._out_of_budget():
+                        break
+                    continue
+                sheet_name, results, missing_columns, truncated, _ = self._check_columns(
+                    sheet_name
+                )
+                self._report_columns(sheet_name, results, missing_columns, truncated)
+            return
 
-            metadata = self._metadata[sheet_name]
-            for column_spec in self._specs.get(sheet_name, []):
-                column = []
-                if column_spec.name not in metadata.columns:
-                    if column_spec.required:
+        with ThreadPoolExecutor(max_workers=self.column_workers) as executor:
+            # The columns of every sheet are checked while the next sheets are read,
+            # their issues are reported in the order of a serial run
+            checked = [
+                self._check_columns(sheet_name, executor)
+                for sheet_name in list(self.sheet_names)
+            ]
+            for sheet_name, results, missing_columns, truncated, futures in checked:
+                for future in futures:
+                    future.result()
+                self._report_columns(sheet_name, results, missing_columns, truncated)
+
+    def _check_columns(
+        self, sheet_name: str, executor: Optional[ThreadPoolExecutor] = None
+    ) -> Tuple[str, Dict[str, _ColumnResult], List[str], bool, List[Future]]:
+        """Run the column rules of a sheet, on the threads of the executor if one is given.
+
+        The futures of the last frame are returned, the results are complete once
+        they are done.
+        """
+        column_specs = self._specs.get(sheet_name, [])
+        missing_columns: List[str] = []
+        results: Dict[str, _ColumnResult] = {}
+        futures: List[Future] = []
+        # Failed cells which can still be reported, the rules stop when none is left
+        limit = self._remaining(sheet_name)
+        truncated = False
+
+        names = [column_spec.name for column_spec in column_specs]
+        for i, frame in enumerate(self._iter_frames(sheet_name, names)):
+            if i == 0:
+                for column_spec in column_specs:
+                    if column_spec.name in frame.columns:
+                        results[column_spec.name] = _ColumnResult()
+                    elif column_spec.required:
+                        # If the column doesn't exist, we don't need to validate the type
                         missing_columns.append(column_spec.name)
 
-                    # If the column doesn't exist, we don't need to validate the type
-                    continue
-                else:
-                    column = metadata[column_spec.name]
-
-                if column.isnull().all():
-                    if column_spec.required:
-                        self._add_error(
-                            sheet_name, f"Column {column_spec.name} is empty."
-                        )
-                    else:
-                        self._add_warning(
-                            sheet_name, f"Column {column_spec.name} is empty."
-                        )
+            if executor is not None:
+                # The next frame was read meanwhile, but the result of a column is
+                # updated one frame after the other
+                for future in futures:
+                    future.result()
+                futures = [
+                    executor.submit(
+                        self._update_column,
+                        sheet_name,
+                        column_spec,
+                        results[column_spec.name],
+                        frame[column_spec.name],
+                    )
+                    for column_spec in column_specs
+                    if column_spec.name in results
+                ]
+                continue
+
+            for column_spec in column_specs:
+                if limit <= 0:
+                    truncated = True
+                    break
+                if column_spec.name in results:
+                    limit -= self._update_column(
+                        sheet_name,
+                        column_spec,
+                        results[column_spec.name],
+                        frame[column_spec.name],
+                        limit,
+                    )
 
-                    continue
-                elif column.isnull().any():
+            if truncated:
+                break
+
+        return sheet_name, results, missing_columns, truncated, futures
+
+    def _report_columns(
+        self,
+        sheet_name: str,
+        results: Dict[str, _ColumnResult],
+        missing_columns: List[str],
+        truncated: bool,
+    ) -> None:
+        """Add the issues of the column rules of a sheet."""
+        cell_issues: List[Issue] = []
+        for column_spec in self._specs.get(sheet_name, []):
+            name = column_spec.name
+            result = results.get(name)
+            if result is None:
+                continue
+
+            # The null counts of a column which was not read to the end mean nothing
+            if not truncated and result.nulls == result.rows:
+                if column_spec.required:
+                    self._add_error(
+                        sheet_name, f"Column {name} is empty.", name, rule="empty"
+                    )
+                else:
                     self._add_warning(
-                        sheet_name, f"Column {column_spec.name} has null values."
+                        sheet_name, f"Column {name} is empty.", name, rule="empty"
                     )
-                    # Remove null values, they may cause problems when validating the type
-                    column = column.dropna()
-
-                if column_spec.type == "text":
-                    if column_spec.regex:
-                        r = column.apply(
-                            lambda x: re.match(column_spec.regex, x) is not None  # type: ignore
-                        )
-                        if not r.all():
-                            wrong_type_columns.append(
-                                {
-                                    column_spec.name: f"{column_spec.name} has values that do not match {column_spec.regex}"
-                                }
-                            )
-                            continue
-
-                elif column_spec.type == "number" or column_spec.type == "float":
-                    if column_spec.min:
-                        r = column.apply(lambda x: x >= column_spec.min)
-                        if not r.all():
-                            wrong_type_columns.append(
-                                {
-                                    column_spec.name: f"{column_spec.name} has values less than {column_spec.min}"
-                                }
-                            )
-                            continue
-
-                    if column_spec.max:
-                        r = column.apply(lambda x: x <= column_spec.max)
-                        if not r.all():
-                            wrong_type_columns.append(
-                                {
-                                    column_spec.name: f"{column_spec.name} has values greater than {column_spec.max}"
-                                }
-                            )
-                            continue
-
-                elif column_spec.type == "category":
-                    if column_spec.options:
-                        r = column.apply(lambda x: x in column_spec.options)
-                        if not r.all():
-                            wrong_type_columns.append(
-                                {
-                                    column_spec.name: f"{column_spec.name} has values not in {column_spec.options}"
-                                }
-                            )
-                            continue
-
-            if missing_columns:
-                self._add_error(sheet_name, f"Missing columns: {missing_columns}")
-
-            if wrong_type_columns:
-                wrong_type_columns_str = "\n".join(
-                    [f"{k}: {v}" for d in wrong_type_columns for k, v in d.items()]
+
+                continue
+            elif not truncated and result.nulls:
+                self._add_warning(
+                    sheet_name, f"Column {name} has null values.", name, rule="null"
                 )
-                self._add_error(
-                    sheet_name, f"Wrong type columns: {wrong_type_columns_str}"
+
+            for rule_id, (msg, rows, values) in result.violations.items():
+                values = [to_builtin(value) for value in values]
+                suggestions = (
+                    _suggestions(column_spec, values) if rule_id == "options" else {}
+                )
+                cell_issues.extend(
+                    Issue(
+                        ERROR,
+                        sheet_name,
+                        name,
+                        row,
+                        rule_id,
+                        value,
+                        msg,
+                        suggestions.get(value),
+                    )
+                    for row, value in zip(rows, values)
                 )
 
-    def _validate_rows(self) -> None:
-        pass
+        if missing_columns:
+            self._add_error(
+                sheet_name, f"Missing columns: {missing_columns}", rule="missing"
+            )
 
+        for issue in cell_issues:
+            self._add_issue(issue)
 
-class DNAseqMetadataValidator(MetadataValidator):
-    def __init__(self, filepath: Path) -> None:
-        specs = DNAseqSpec().specs
-        sheet_names = list(specs.keys())
-        super().__init__(filepath, specs, sheet_names)
+        if truncated:
+            self._stop(sheet_name)
 
-    def validate(self):
-        self._validate_columns()
-        self._validate_rows()
+    def _update_column(
+        self,
+        sheet_name: str,
+        column_spec: ColumnSpec,
+        result: _ColumnResult,
+        column: pd.Series,
+        limit: float = float("inf"),
+    ) -> int:
+        """Run the rules of a column into its result, timed when profiling."""
+        if self._profiler is None:
+            return result.update(column_spec, column, limit)
+
+        path = ("columns", sheet_name, column_spec.name)
+        with self._profiler.measure(path, len(column)):
+            return result.update(column_spec, column, limit, self._profiler, path)
+
+    def _build_indexes(self) -> Dict[Tuple[str, str], Dict[str, List[int]]]:
+        """Index the unique and linked columns, value -> row indexes, in one pass per sheet."""
+        key_columns: Dict[str, List[str]] = {}
+        for sheet_name, column_specs in self._specs.items():
+            for column_spec in column_specs:
+                if column_spec.unique:
+                    key_columns.setdefault(sheet_name, []).append(column_spec.name)
+        for link in self._links:
+            for sheet_name in link.sheets:
+                columns = key_columns.setdefault(sheet_name, [])
+                if link.column not in columns:
+                    columns.append(link.column)
+
+        indexes: Dict[Tuple[str, str], Dict[str, List[int]]] = {}
+        for sheet_name in self.sheet_names:
+            columns = key_columns.get(sheet_name)
+            if not columns:
+                continue
+
+            for frame in self._iter_frames(sheet_name, columns):
+                for column in columns:
+                    # Missing columns are reported by _validate_columns
+                    if column not in frame.columns:
+                        continue
+
+                    index = indexes.setdefault((sheet_name, column), {})
+                    with self._measure(("rows", sheet_name, column, "index"), len(frame)):
+                        values = frame[column].dropna()
+                        for value, row in zip(values.tolist(), values.index.tolist()):
+                            # Compare as text, an id may be read as a number in one sheet only
+                            key = str(value)
+                            if key in index:
+                                index[key].append(row)
+                            else:
+                                index[key] = [row]
+
+        return indexes
+
+    def _validate_rows(self) -> Dict[Tuple[str, str], Dict[str, List[int]]]:
+        """Check the unique and linked columns, returns their indexes."""
+        if not self._specs:
+            return {}
 
+        if self._out_of_budget():
+            return {}
 
-class RNAseqMetadataValidator(MetadataValidator):
-    def __init__(self, filepath: Path) -> None:
-        specs = RNAseqSpec().specs
-        sheet_names = list(specs.keys())
-        super().__init__(filepath, specs, sheet_names)
+        indexes = self._build_indexes()
+        # The rows are only counted for the profiler, one key at a time
+        profiled = self._profiler is not None
 
-    def validate(self):
-        self._validate_columns()
-        self._validate_rows()
+        for sheet_name in self.sheet_names:
+            if self._out_of_budget():
+                break
 
+            for column_spec in self._specs.get(sheet_name, []):
+                name = column_spec.name
+                index = indexes.get((sheet_name, name))
+                if not column_spec.unique or index is None:
+                    continue
 
-class MetabolomicsMetadataValidator(MetadataValidator):
-    def __init__(self, filepath: Path) -> None:
-        specs = MetabolomicsSpec().specs
-        sheet_names = list(specs.keys())
-        super().__init__(filepath, specs, sheet_names)
+                with self._measure(("rows", sheet_name, name, "unique")) as counts:
+                    for key, rows in index.items():
+                        if self._should_stop(sheet_name):
+                            break
+                        if profiled:
+                            counts.rows += len(rows)
+                        if len(rows) > 1:
+                            counts.violations += len(rows)
+                            msg = f"Column {name} has duplicated value {key}"
+                            for row in rows:
+                                self._add_error(sheet_name, msg, name, row + 2, "unique", key)
+
+        for link in self._links:
+            for sheet_name in link.sheets:
+                index = indexes.get((sheet_name, link.column))
+                if index is None or self._out_of_budget():
+                    continue
 
-    def validate(self):
-        self._validate_columns()
-        self._validate_rows()
+                for other in link.sheets:
+                    other_index = indexes.get((other, link.column))
+                    if other == sheet_name or other_index is None:
+                        continue
+
+                    path = ("rows", sheet_name, link.column, "link")
+                    with self._measure(path) as counts:
+                        for key, rows in index.items():
+                            if self._should_stop(sheet_name):
+                                break
+                            if profiled:
+                                counts.rows += len(rows)
+                            if key not in other_index:
+                                counts.violations += len(rows)
+                                msg = f"Column {link.column} value {key} not found in sheet {other}"
+                                for row in rows:
+                                    self._add_error(
+                                        sheet_name, msg, link.column, row + 2, "link", key
+                                    )
+
+        return indexes
+
+    def _check_project_keys(self, indexes: Dict[Tuple[str, str], Dict[str, List[int]]]) -> None:
+        """Report the keys of other submissions, register the unique columns if the file is valid."""
+        keys = {}
+        for sheet_name, column_specs in self._specs.items():
+            for column_spec in column_specs:
+                index = indexes.get((sheet_name, column_spec.name))
+                if column_spec.unique and index is not None:
+                    # The index holds the excel row numbers
+                    keys[(sheet_name, column_spec.name)] = {
+                        key: [row + 2 for row in rows] for key, rows in index.items()
+                    }
+
+        # A submission with errors is only checked, it must not hold its keys
+        store = not self.has_errors
+        with self._measure(("rows", "[project]", "register")) as counts:
+            if self._profiler is not None:
+                counts.rows = sum(len(rows) for index in keys.values() for rows in index.values())
+            collisions = self._key_index.register(self.submission, keys, store)
+            counts.violations = len(collisions)
+
+        for collision in collisions:
+            if self._should_stop(collision.sheet):
+                continue
+            msg = (
+                f"Column {collision.column} value {collision.key} is already used "
+                f"in submission {collision.submission} (row {collision.other_row})"
+            )
+            self._add_error(
+                collision.sheet,
+                msg,
+                collision.column,
+                collision.row,
+                "project_unique",
+                collision.key,
+            )
+
+    def _iter_file_records(self, sheet_name: str) -> Iterator[FileRecord]:
+        columns = ["file_name", "file_size", "md5sum"]
+        for frame in self._iter_frames(sheet_name, columns):
+            if "file_name" not in frame.columns:
+                return
+
+            file_names = frame["file_name"]
+            sizes = (
+                pd.to_numeric(frame["file_size"], errors="coerce")
+                if "file_size" in frame.columns
+                else pd.Series(float("nan"), index=frame.index)
+            )
+            md5sums = (
+                frame["md5sum"]
+                if "md5sum" in frame.columns
+                else pd.Series(None, index=frame.index, dtype=object)
+            )
+            for row, file_name, size, md5 in zip(
+                frame.index.tolist(), file_names.tolist(), sizes.tolist(), md5sums.tolist()
+            ):
+                if pd.isnull(file_name):
+                    continue
+
+                yield FileRecord(
+                    row=row,
+                    file_name=str(file_name),
+                    size=None if pd.isnull(size) else int(size),
+                    md5sum=None if pd.isnull(md5) else str(md5),
+                )
+
+    def verify_files(
+        self,
+        data_dir: Path,
+        workers: int = 8,
+        cache: Optional[ChecksumCache] = None,
+    ) -> None:
+        """Check the files of the file_name column against the file_size and md5sum columns.
+
+        The files are looked up in data_dir and hashed on a pool of `workers` threads,
+        the checksums of unchanged files are reused from the cache.
+        """
+        if self.cached:
+            raise RuntimeError(
+                "The results come from the result cache, the file was not parsed."
+            )
+
+        for sheet_name in list(self.sheet_names):
+            if self._should_stop(sheet_name):
+                if self._out_of_budget():
+                    break
+                continue
+
+            records = self._iter_file_records(sheet_name)
+            results = verify_files(records, data_dir, workers, cache)
+            with self._measure(("files", sheet_name, "file_name", "file")) as counts:
+                for record, error in results:
+                    if self._should_stop(sheet_name):
+                        results.close()
+                        break
+                    counts.violations += 1
+                    self._add_error(
+                        sheet_name,
+                        error,
+                        "file_name",
+                        record.row + 2,
+                        "file",
+                        record.file_name,
+                    )
+
+    def export(
+        self,
+        output: Union[str, Path, BaseWriter],
+        format: Optional[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        source: Optional[str] = None,
+        allow_errors: bool = False,
+    ) -> Dict[str, int]:
+        """Append the validated sheets to a dataset, returns the number of rows by sheet.
+
+        output is the path of the dataset (see `export`, the format is detected from
+        its extension by default) or an open writer, which is left open so that many
+        files are appended through it. The columns of the specs are written with their
+        types, the rows are tagged with source (the submission by default). The file
+        is validated first if it wasn't yet. A file with errors is only exported with
+        allow_errors: the cells which aren't numbers, booleans or dates in such
+        columns are nulls, the other invalid cells (regex, options, ranges) are
+        exported as they are.
+        """
+        if not self.validated:
+            self.validate()
+        if self.has_errors and not allow_errors:
+            raise ValueError(
+                f"{self.file_path} has errors, fix them before the export or use allow_errors."
+            )
+
+        source = source or self.submission
+        writer = output if isinstance(output, BaseWriter) else get_writer(output, format, batch_size)
+        counts: Dict[str, int] = {}
+        try:
+            for sheet_name in self.sheet_names:
+                column_specs = self._specs.get(sheet_name)
+                if not column_specs:
+                    continue
+
+                columns = [column_spec.name for column_spec in column_specs]
+                frames = (
+                    normalize_frame(frame, column_specs, source)
+                    for frame in self._iter_frames(sheet_name, columns)
+                )
+                with self._measure(("export", sheet_name)) as stat:
+                    counts[sheet_name] = writer.write_sheet(
+                        sheet_name, column_specs, frames, source
+                    )
+                    stat.rows = counts[sheet_name]
+        finally:
+            self._close_reader()
+            if writer is not output:
+                writer.close()
+        return counts
+
+
+class DNAseqMetadataValidator(MetadataValidator):
+    def __init__(self, filepath: Path, **kwargs) -> None:
+        plan = DNAseqSpec().plan
+        super().__init__(
+            filepath,
+            plan.sheets,
+            plan.sheet_names,
+            links=plan.links,
+            spec_id=f"DNAseqSpec:{plan.version}",
+            **kwargs,
+        )
+
+
+class RNAseqMetadataValidator(MetadataValidator):
+    def __init__(self, filepath: Path, **kwargs) -> None:
+        plan = RNAseqSpec().plan
+        super().__init__(
+            filepath,
+            plan.sheets,
+            plan.sheet_names,
+            links=plan.links,
+            spec_id=f"RNAseqSpec:{plan.version}",
+            **kwargs,
+        )
+
+
+class MetabolomicsMetadataValidator(MetadataValidator):
+    def __init__(self, filepath: Path, **kwargs) -> None:
+        plan = MetabolomicsSpec().plan
+        super().__init__(
+            filepath,
+            plan.sheets,
+            plan.sheet_names,
+            links=plan.links,
+            spec_id=f"MetabolomicsSpec:{plan.version}",
+            **kwargs,
+        )
+
+
+validator_dict = {
+    "DNAseq": DNAseqMetadataValidator,
+    "RNAseq": RNAseqMetadataValidator,
+    "Proteomics": None,
+    "Metabolomics": MetabolomicsMetadataValidator,
+}
 
 
 if __name__ == "__main__":
@@ -10,23 +10,27 @@ with open("README.md") as readme_file:
 with open("HISTORY.rst") as history_file:
     history = history_file.read()
 
-requirements = ["Click>=7.0", "openpyxl", "pandas"]
+# pandas 2 matches the format of to_datetime exactly, 1.x takes "2021-05" for
+# "%Y-%m-%d" (dates.py)
+requirements = ["Click>=7.0", "openpyxl", "pandas>=2.0"]
 
 test_requirements = []
 
 setup(
     author="Jingcheng Yang",
     author_email="yjcyxky@163.com",
-    python_requires=">=3.6",
+    # Path.is_relative_to and Executor.shutdown(cancel_futures=...)
+    python_requires=">=3.9",
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
         "Intended Audience :: Developers",
         "License :: OSI Approved :: MIT License",
         "Natural Language :: English",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
-        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
+        "Programming Language :: Python :: 3.12",
     ],
     description="Metadata validator for the Quartet project",
     entry_points={
@@ -35,6 +39,12 @@ setup(
         ],
     },
     install_requires=requirements,
+    extras_require={
+        # Parquet and arrow inputs, multi-threaded csv parsing
+        "arrow": ["pyarrow"],
+        # Export to a duckdb database
+        "duckdb": ["duckdb"],
+    },
     license="MIT license",
     long_description=readme + "\n\n" + history,
     include_package_data=True,
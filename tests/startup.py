@@ -0,0 +1,46 @@
+"""Run metav in a fresh interpreter, shared by test_startup and benchmarks/startup.py."""
+import sys
+import time
+import tempfile
+import subprocess
+from typing import Dict, List, Set, Tuple
+
+# command name -> (arguments, modules which must not be imported)
+COMMANDS: Dict[str, Tuple[List[str], List[str]]] = {
+    "help": (["--help"], ["pandas", "openpyxl", "numpy"]),
+    "generate-template": (
+        ["generate-template", "-t", "RNAseq", "-o", "{tmpdir}/template.xlsx"],
+        # openpyxl imports numpy itself when it is installed
+        ["pandas"],
+    ),
+}
+
+def run_command(args: List[str]) -> Tuple[float, Set[str]]:
+    """Run metav in a fresh interpreter, returns the wall time and the imported modules."""
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "metadata_validator.cli", *args],
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError(f"metav {' '.join(args)} failed:\n{process.stderr}")
+
+    modules = set()
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            if name != "imported package":
+                modules.add(name)
+    return elapsed, modules
+
+
+def forbidden_imports(command: str) -> List[str]:
+    """Run a command once, returns the forbidden modules it imported."""
+    args, forbidden = COMMANDS[command]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        args = [arg.format(tmpdir=tmpdir) for arg in args]
+        _, modules = run_command(args)
+    return [name for name in forbidden if name in modules]
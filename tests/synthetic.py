@@ -0,0 +1,131 @@
+"""Generate synthetic metadata workbooks from the specs.
+
+Every value is derived from the fields of the column (type, options, regex, min,
+max and example), so a valid workbook passes the validation. An invalid workbook
+has a given rate of cells replaced by values which break the rule of their column.
+
+Usage::
+
+    python -m tests.synthetic -t RNAseq -n 100000 -o rnaseq.xlsx --invalid-rate 0.01
+"""
+import random
+import argparse
+from pathlib import Path
+from typing import Any, Iterator, List, Sequence
+
+from openpyxl import Workbook
+
+from metadata_validator.specs import spec_dict
+from metadata_validator.specs.spec import BaseSpec, ColumnSpec, Type
+
+
+def valid_value(column: ColumnSpec, i: int, rng: random.Random) -> Any:
+    if column.type == Type.CATEGORY and column.options:
+        return rng.choice(column.options)
+
+    if column.type == Type.NUMBER and column.min is not None and column.max is not None:
+        # Keep the values close to the example, e.g. dates must be real dates
+        if isinstance(column.example, int) and column.min <= column.example <= column.max:
+            return column.example
+        return rng.randint(int(column.min), int(column.max))
+
+    if column.type == Type.DATE:
+        # YYYYMMDD integers, like the examples of the specs
+        return column.example
+
+    if column.type == Type.BOOLEAN:
+        return rng.choice(["TRUE", "FALSE", "Yes", "No"])
+
+    if column.type == Type.FLOAT and column.min is not None and column.max is not None:
+        return round(rng.uniform(column.min, column.max), 3)
+
+    if column.type == Type.TEXT:
+        if column.regex is not None or column.example in (None, ""):
+            if column.regex is not None:
+                # The example is the only value known to match the regex
+                return column.example
+            return f"{column.name}_{i}"
+
+        # Row dependent values, unique and linked columns (e.g. library_id) must
+        # produce the same value for the same row in every sheet
+        return f"{column.example}_{i}"
+
+    return column.example
+
+
+def invalid_value(column: ColumnSpec, rng: random.Random) -> Any:
+    if column.type == Type.CATEGORY and column.options:
+        return f"not_{column.options[0]}"
+
+    if column.type in (Type.NUMBER, Type.FLOAT):
+        if column.max is not None and rng.random() < 0.5:
+            return column.max + 1
+        return "not a number"
+
+    if column.type == Type.DATE:
+        if column.max is not None and rng.random() < 0.5:
+            # One year after the max, a real date which is out of range
+            return int(column.max) + 10000
+        # Not a calendar date
+        return 20201332
+
+    if column.type == Type.BOOLEAN:
+        return "maybe"
+
+    if column.type == Type.TEXT and column.regex is not None:
+        return "does not match"
+
+    # No rule can be broken, remove a required value instead
+    return None
+
+
+def generate_rows(
+    columns: Sequence[ColumnSpec],
+    n: int,
+    invalid_rate: float = 0.0,
+    seed: int = 0,
+) -> Iterator[List[Any]]:
+    """Yield the header, then n rows of the columns."""
+    rng = random.Random(seed)
+    yield [column.name for column in columns]
+
+    for i in range(n):
+        row = [valid_value(column, i, rng) for column in columns]
+        if invalid_rate and rng.random() < invalid_rate:
+            j = rng.randrange(len(columns))
+            row[j] = invalid_value(columns[j], rng)
+        yield row
+
+
+def generate_workbook(
+    spec: BaseSpec,
+    filepath: Path,
+    n: int,
+    invalid_rate: float = 0.0,
+    seed: int = 0,
+) -> Path:
+    """Write a workbook with n rows in every sheet of the spec."""
+    wb = Workbook(write_only=True)
+    for sheet_name, columns in spec.plan.sheets.items():
+        ws = wb.create_sheet(sheet_name)
+        for row in generate_rows(columns, n, invalid_rate, seed):
+            ws.append(row)
+    wb.save(filepath)
+    return filepath
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--template-type", "-t", required=True, choices=list(spec_dict))
+    parser.add_argument("--rows", "-n", type=int, default=1000)
+    parser.add_argument("--output", "-o", required=True)
+    parser.add_argument("--invalid-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    spec = spec_dict[args.template_type]()
+    generate_workbook(spec, Path(args.output), args.rows, args.invalid_rate, args.seed)
+
+
+if __name__ == "__main__":
+    main()
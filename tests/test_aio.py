@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+"""Tests for `metadata_validator.aio` module."""
+
+
+import asyncio
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from metadata_validator.aio import validate_file_async, validate_many
+from metadata_validator.specs import DNAseqSpec
+
+from .synthetic import generate_workbook
+
+
+class TestAsyncValidation(unittest.TestCase):
+    """Tests for `validate_many`."""
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        spec = DNAseqSpec()
+        self.filepaths = [
+            generate_workbook(
+                spec,
+                self.tmpdir / f"submission_{i}.xlsx",
+                5,
+                invalid_rate=0.5 * (i % 2),
+                seed=i,
+            )
+            for i in range(6)
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_validate_file_async(self):
+        result = asyncio.run(validate_file_async(self.filepaths[1], "DNAseq"))
+        self.assertEqual(result.path, str(self.filepaths[1]))
+        self.assertFalse(result.valid)
+
+    def test_validate_many(self):
+        async def collect():
+            return [
+                result
+                async for result in validate_many(self.filepaths, "DNAseq", concurrency=2)
+            ]
+
+        results = asyncio.run(collect())
+        self.assertEqual(
+            sorted(result.path for result in results),
+            sorted(str(filepath) for filepath in self.filepaths),
+        )
+        for result in results:
+            index = int(Path(result.path).stem.split("_")[1])
+            self.assertEqual(result.valid, index % 2 == 0)
+
+    def test_backpressure(self):
+        pulled = []
+        consumed = []
+
+        async def intake():
+            for filepath in self.filepaths + [self.tmpdir / "missing.xlsx"]:
+                pulled.append(filepath)
+                yield filepath
+
+        async def consume():
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                async for result in validate_many(
+                    intake(), "DNAseq", concurrency=2, executor=executor
+                ):
+                    # The intake never runs ahead of the consumer by more than the slots
+                    self.assertLessEqual(len(pulled) - len(consumed), 2)
+                    await asyncio.sleep(0.01)
+                    consumed.append(result)
+
+        asyncio.run(consume())
+        self.assertEqual(len(consumed), 7)
+        missing = [result for result in consumed if result.path.endswith("missing.xlsx")]
+        self.assertEqual([issue.rule for issue in missing[0].issues], ["read", "read"])
+
+    def test_exceptions(self):
+        async def collect():
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                return [
+                    result
+                    async for result in validate_many(
+                        self.filepaths, "DNAseq", executor=executor, chunk_size=-1
+                    )
+                ]
+
+        results = asyncio.run(collect())
+        self.assertEqual(len(results), len(self.filepaths))
+        for result in results:
+            self.assertIsInstance(result.exception, ValueError)
+            self.assertFalse(result.valid)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+"""Tests for `metadata_validator.batch` module."""
+
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from metadata_validator.batch import collect_files, validate_batch
+from metadata_validator.specs import DNAseqSpec
+
+from .utils import write_workbook, example_rows
+
+
+class TestBatch(unittest.TestCase):
+    """Tests for the batch validation."""
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        spec = DNAseqSpec()
+        self.filepaths = []
+        for i in range(3):
+            sheets = {
+                sheet_name: example_rows(spec, sheet_name)
+                for sheet_name in spec.sheet_names
+            }
+            if i == 1:
+                del sheets["quality_control"]
+            self.filepaths.append(
+                write_workbook(self.tmpdir / f"submission_{i}.xlsx", sheets)
+            )
+        (self.tmpdir / "notes.txt").write_text("not a workbook")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_collect_files(self):
+        self.assertEqual(collect_files(str(self.tmpdir)), self.filepaths)
+        self.assertEqual(
+            collect_files(str(self.tmpdir / "*_1.xlsx")), self.filepaths[1:2]
+        )
+
+    def test_validate_batch(self):
+        serial = list(validate_batch(self.filepaths, "DNAseq", jobs=1))
+        parallel = list(validate_batch(self.filepaths, "DNAseq", jobs=2))
+        self.assertEqual(serial, parallel)
+        self.assertEqual([r[0] for r in parallel], [str(p) for p in self.filepaths])
+        self.assertIn("Reading excel file quality_control", parallel[1][1])
+        self.assertNotIn("Reading excel file quality_control", parallel[0][1])
+
+    def test_unsupported_template_type(self):
+        with self.assertRaises(ValueError):
+            list(validate_batch(self.filepaths, "Proteomics"))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+"""Tests for `metadata_validator.checksum` module."""
+
+
+import hashlib
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from metadata_validator.cache import ChecksumCache
+from metadata_validator.checksum import FileRecord, md5sum, verify_files
+
+
+class TestChecksum(unittest.TestCase):
+    """Tests for the on-disk verification of the data files."""
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.content = b"ACGT" * 1000
+        (self.tmpdir / "a.fastq").write_bytes(self.content)
+        self.md5 = hashlib.md5(self.content).hexdigest()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_md5sum(self):
+        self.assertEqual(md5sum(self.tmpdir / "a.fastq", buffer_size=7), self.md5)
+        (self.tmpdir / "empty").write_bytes(b"")
+        self.assertEqual(md5sum(self.tmpdir / "empty"), hashlib.md5().hexdigest())
+
+    def test_verify_files(self):
+        records = [
+            FileRecord(0, "a.fastq", len(self.content), self.md5),
+            FileRecord(1, "a.fastq", 1, self.md5),
+            FileRecord(2, "a.fastq", None, "0" * 32),
+            FileRecord(3, "missing.fastq", None, None),
+        ]
+        errors = list(verify_files(records, self.tmpdir, workers=2))
+        self.assertEqual([record.row for record, _ in errors], [1, 2, 3])
+        self.assertIn("has 4000 bytes, but the file_size is 1", errors[0][1])
+        self.assertIn(f"has md5sum {self.md5}", errors[1][1])
+        self.assertIn("not found", errors[2][1])
+
+    def test_outside_data_dir(self):
+        data_dir = self.tmpdir / "data"
+        data_dir.mkdir()
+        (data_dir / "b.fastq").write_bytes(self.content)
+        records = [
+            FileRecord(0, "b.fastq", None, self.md5),
+            FileRecord(1, "../a.fastq", None, self.md5),
+            FileRecord(2, str(self.tmpdir / "a.fastq"), None, self.md5),
+        ]
+        errors = list(verify_files(records, data_dir))
+        self.assertEqual([record.row for record, _ in errors], [1, 2])
+        for _, error in errors:
+            self.assertIn("is outside of", error)
+
+    def test_symlink(self):
+        # The data files are links to files kept elsewhere
+        data_dir = self.tmpdir / "data"
+        (data_dir / "run").mkdir(parents=True)
+        (data_dir / "run" / "a.fastq").symlink_to(self.tmpdir / "a.fastq")
+        (data_dir / "runs").symlink_to(self.tmpdir)
+        records = [
+            FileRecord(0, "run/a.fastq", len(self.content), self.md5),
+            FileRecord(1, "runs/a.fastq", None, self.md5),
+            FileRecord(2, "run/../../a.fastq", None, self.md5),
+        ]
+        errors = list(verify_files(records, data_dir))
+        self.assertEqual([record.row for record, _ in errors], [2])
+        self.assertIn("is outside of", errors[0][1])
+
+    def test_cache(self):
+        cache_path = self.tmpdir / "cache" / "checksums.json"
+        records = [FileRecord(0, "a.fastq", None, self.md5)]
+        self.assertEqual(list(verify_files(records, self.tmpdir, cache=ChecksumCache(cache_path))), [])
+
+        entries = json.loads(cache_path.read_text())
+        key = str((self.tmpdir / "a.fastq").resolve())
+        self.assertEqual(entries[key][2], self.md5)
+
+        # A cached checksum is trusted as long as mtime and size are unchanged
+        entries[key][2] = "0" * 32
+        cache_path.write_text(json.dumps(entries))
+        errors = list(verify_files(records, self.tmpdir, cache=ChecksumCache(cache_path)))
+        self.assertEqual(len(errors), 1)
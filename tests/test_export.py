@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+"""Tests for `metadata_validator.export` module."""
+
+
+import importlib.util
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+from click.testing import CliRunner
+
+from .synthetic import generate_workbook
+from metadata_validator import cli
+from metadata_validator.export import ROW, SOURCE, get_writer, normalize_column
+from metadata_validator.readers import HAS_PYARROW
+from metadata_validator.specs import RNAseqSpec
+from metadata_validator.specs.spec import Type
+from metadata_validator.validator import RNAseqMetadataValidator
+
+HAS_DUCKDB = importlib.util.find_spec("duckdb") is not None
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        spec = RNAseqSpec()
+        self.filepaths = [
+            generate_workbook(spec, self.tmpdir / f"{n}.xlsx", 12, seed=n) for n in range(2)
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _export(self, output, chunk_size=None):
+        # The second file is exported twice, it replaces its previous rows
+        with get_writer(output, batch_size=5) as writer:
+            for filepath in self.filepaths + self.filepaths[1:]:
+                validator = RNAseqMetadataValidator(filepath, chunk_size=chunk_size)
+                validator.validate()
+                counts = validator.export(writer)
+                self.assertEqual(counts, {"metadata": 12, "quality_control": 12})
+
+    def _check(self, frame):
+        self.assertEqual(len(frame), 24)
+        self.assertEqual(list(frame.columns[:2]), [SOURCE, ROW])
+        self.assertEqual(
+            sorted(set(frame[SOURCE])), [str(path.resolve()) for path in self.filepaths]
+        )
+        self.assertEqual(sorted(frame[ROW].unique()), list(range(2, 14)))
+
+    def test_normalize_column(self):
+        values = pd.Series(["TRUE", "no", None, "maybe"], dtype=object)
+        self.assertEqual(
+            normalize_column(values, Type.BOOLEAN).tolist(), [True, False, pd.NA, pd.NA]
+        )
+        values = pd.Series([20210523, "2021-05-24", None], dtype=object)
+        self.assertEqual(
+            normalize_column(values, Type.DATE).dt.strftime("%Y-%m-%d").tolist()[:2],
+            ["2021-05-23", "2021-05-24"],
+        )
+        values = pd.Series([1001.0, "A1", None], dtype=object)
+        self.assertEqual(normalize_column(values, Type.TEXT).tolist(), ["1001", "A1", pd.NA])
+        values = pd.Series(["1.5", "x", 2], dtype=object)
+        self.assertEqual(normalize_column(values, Type.NUMBER).tolist(), [1.5, pd.NA, 2.0])
+
+    def test_sqlite(self):
+        for chunk_size in [None, 5]:
+            output = self.tmpdir / f"dataset_{chunk_size}.sqlite"
+            self._export(output, chunk_size)
+            with sqlite3.connect(output) as connection:
+                frame = pd.read_sql_query("SELECT * FROM metadata", connection)
+                self._check(frame)
+                self.assertEqual(
+                    set(frame["is_paired_end"].dropna()) | set(frame["is_strand_specific"]),
+                    {0, 1},
+                )
+                self.assertRegex(frame["run_date"][0], r"^\d{4}-\d{2}-\d{2}$")
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_parquet(self):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        output = self.tmpdir / "dataset"
+        self._export(output)
+        table = ds.dataset(output / "metadata", format="parquet").to_table()
+        self._check(table.to_pandas())
+        self.assertEqual(table.schema.field("run_date").type, pa.date32())
+        self.assertEqual(table.schema.field("is_paired_end").type, pa.bool_())
+
+    @unittest.skipUnless(HAS_DUCKDB, "duckdb is not installed")
+    def test_duckdb(self):
+        import duckdb
+
+        output = self.tmpdir / "dataset.duckdb"
+        self._export(output, chunk_size=5)
+        with duckdb.connect(str(output)) as connection:
+            self._check(connection.execute("SELECT * FROM metadata").df())
+            types = dict(
+                connection.execute(
+                    "SELECT column_name, data_type FROM information_schema.columns "
+                    "WHERE table_name = 'metadata'"
+                ).fetchall()
+            )
+        self.assertEqual(types["run_date"], "DATE")
+        self.assertEqual(types["file_size"], "DOUBLE")
+
+    def test_errors(self):
+        invalid = generate_workbook(
+            RNAseqSpec(), self.tmpdir / "invalid.xlsx", 12, invalid_rate=0.3, seed=3
+        )
+        # The export validates the file first
+        validator = RNAseqMetadataValidator(invalid)
+        with self.assertRaises(ValueError):
+            validator.export(self.tmpdir / "dataset.sqlite")
+        self.assertTrue(validator.validated)
+        counts = validator.export(self.tmpdir / "dataset.sqlite", allow_errors=True)
+        self.assertEqual(counts["metadata"], 12)
+
+    def test_cli(self):
+        output = self.tmpdir / "dataset.sqlite"
+        runner = CliRunner()
+        result = runner.invoke(
+            cli.cli,
+            ["export", "-i", str(self.tmpdir / "*.xlsx"), "-o", str(output), "-t", "RNAseq"]
+            + ["-b", "4"],
+        )
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("metadata 12 rows", result.output)
+        with sqlite3.connect(output) as connection:
+            self._check(pd.read_sql_query("SELECT * FROM quality_control", connection))
+
+
+if __name__ == "__main__":
+    unittest.main()
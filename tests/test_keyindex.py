@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+
+"""Tests for `metadata_validator.keyindex` module."""
+
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from .synthetic import generate_workbook
+from metadata_validator import cli
+from metadata_validator.batch import validate_batch
+from metadata_validator.keyindex import Collision, KeyIndex
+from metadata_validator.specs import RNAseqSpec
+from metadata_validator.validator import RNAseqMetadataValidator
+
+
+class TestKeyIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.key_index = KeyIndex(self.tmpdir / "keys.sqlite")
+
+    def tearDown(self):
+        self.key_index.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_register(self):
+        column = ("metadata", "file_name")
+        self.assertEqual(
+            self.key_index.register("a", {column: {"x.fq": [2], "y.fq": [3]}}), []
+        )
+        collisions = self.key_index.register("b", {column: {"z.fq": [2], "y.fq": [3, 4]}})
+        self.assertEqual(
+            collisions,
+            [
+                Collision("metadata", "file_name", "y.fq", 3, "a", 3),
+                Collision("metadata", "file_name", "y.fq", 4, "a", 3),
+            ],
+        )
+        # The same value in another column is not a collision
+        self.assertEqual(
+            self.key_index.register("c", {("quality_control", "file_name"): {"x.fq": [2]}}),
+            [],
+        )
+
+        # A submission with a collision is not stored
+        self.assertEqual(self.key_index.register("d", {column: {"z.fq": [2]}}), [])
+
+        # A submission registered again replaces its keys
+        self.assertEqual(self.key_index.register("a", {column: {"w.fq": [2]}}), [])
+        collisions = self.key_index.check("e", {column: {"w.fq": [2], "y.fq": [3]}})
+        self.assertEqual(collisions[0].submission, "a")
+        self.assertEqual(self.key_index.check("e", {column: {"y.fq": [3]}}), [])
+
+        self.key_index.remove("a")
+        self.assertEqual(self.key_index.register("e", {column: {"w.fq": [2]}}), [])
+        self.assertEqual(self.key_index.submissions(), ["c", "d", "e"])
+
+    def test_rollback(self):
+        column = ("metadata", "file_name")
+        self.key_index.register("a", {column: {"x.fq": [2]}})
+        # The new column is rolled back with the submission
+        keys = {column: {"x.fq": [2]}, ("metadata", "library_id"): {"L1": [2]}}
+        self.assertEqual(len(self.key_index.register("b", keys)), 1)
+
+        library_id = ("metadata", "library_id")
+        self.assertEqual(self.key_index.register("c", {library_id: {"L1": [2]}}), [])
+        collisions = self.key_index.check("d", {library_id: {"L1": [3]}})
+        self.assertEqual(collisions, [Collision("metadata", "library_id", "L1", 3, "c", 2)])
+
+    def test_validator(self):
+        spec = RNAseqSpec()
+        first = generate_workbook(spec, self.tmpdir / "first.xlsx", 10, seed=1)
+        second = generate_workbook(spec, self.tmpdir / "second.xlsx", 10, seed=2)
+
+        validator = RNAseqMetadataValidator(first, key_index=self.key_index)
+        validator.validate()
+        self.assertFalse(validator.has_errors)
+
+        for chunk_size in [None, 4]:
+            validator = RNAseqMetadataValidator(
+                second,
+                chunk_size=chunk_size,
+                key_index=self.key_index,
+                submission="second",
+            )
+            validator.validate()
+            issues = [issue for issue in validator.iter_issues() if issue.rule == "project_unique"]
+            # The synthetic workbooks share their file names and library ids
+            self.assertEqual(len(issues), 20)
+            self.assertEqual(issues[0].row, 2)
+            self.assertIn(
+                f"already used in submission {first.resolve()} (row 2)", issues[0].message
+            )
+
+        validator = RNAseqMetadataValidator(
+            second, key_index=self.key_index, submission="second", max_errors=3
+        )
+        validator.validate()
+        errors = [issue for issue in validator.iter_issues() if issue.severity == "error"]
+        self.assertEqual(len(errors), 3)
+
+        # A file with errors is checked but not registered
+        invalid = generate_workbook(
+            spec, self.tmpdir / "invalid.xlsx", 10, invalid_rate=0.3, seed=3
+        )
+        self.key_index.remove(str(first.resolve()))
+        validator = RNAseqMetadataValidator(invalid, key_index=self.key_index)
+        validator.validate()
+        self.assertTrue(validator.has_errors)
+        self.assertEqual(self.key_index.submissions(), [])
+
+    def test_batch(self):
+        spec = RNAseqSpec()
+        # The files have the same name in different directories
+        filepaths = []
+        for n in range(3):
+            (self.tmpdir / str(n)).mkdir()
+            filepaths.append(
+                generate_workbook(spec, self.tmpdir / str(n) / "metadata.xlsx", 5, seed=n)
+            )
+        database = str(self.tmpdir / "batch.sqlite")
+        results = list(validate_batch(filepaths, "RNAseq", jobs=2, key_index=database))
+
+        # Whatever the order of the workers, only the first file registered is valid,
+        # the others are not registered
+        valid = [path for path, errors, _ in results if "Error:" not in errors]
+        self.assertEqual(len(valid), 1)
+        with KeyIndex(database) as key_index:
+            self.assertEqual(key_index.submissions(), [str(Path(valid[0]).resolve())])
+
+    def test_cli_data_dir(self):
+        filepath = generate_workbook(RNAseqSpec(), self.tmpdir / "a.xlsx", 5, seed=1)
+        data_dir = self.tmpdir / "data"
+        data_dir.mkdir()
+        database = str(self.tmpdir / "keys.sqlite")
+
+        def validate(*args):
+            output = self.tmpdir / "output.log"
+            if output.exists():
+                output.unlink()
+            result = CliRunner().invoke(
+                cli.cli,
+                ["validate", "-i", str(filepath), "-o", str(output), "-t", "RNAseq"]
+                + ["--key-index", database, *args],
+            )
+            self.assertEqual(result.exit_code, 0, result.output)
+            return output.read_text()
+
+        # The data files are missing, the file is not registered
+        self.assertIn("not found", validate("--data-dir", str(data_dir)))
+        self.assertEqual(self.key_index.submissions(), [])
+
+        validate()
+        self.assertEqual(self.key_index.submissions(), [str(filepath.resolve())])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,6 @@
 import unittest
 from click.testing import CliRunner
 
-from metadata_validator import metadata_validator
 from metadata_validator import cli
 
 
@@ -25,9 +24,32 @@ class TestMetadata_validator(unittest.TestCase):
     def test_command_line_interface(self):
         """Test the CLI."""
         runner = CliRunner()
-        result = runner.invoke(cli.main)
-        assert result.exit_code == 0
-        assert 'metadata_validator.cli.main' in result.output
-        help_result = runner.invoke(cli.main, ['--help'])
+        result = runner.invoke(cli.cli)
+        assert 'validate' in result.output
+        assert 'generate-template' in result.output
+        help_result = runner.invoke(cli.cli, ['--help'])
         assert help_result.exit_code == 0
         assert '--help  Show this message and exit.' in help_result.output
+
+    def test_fail_fast_exit_status(self):
+        """Test the exit status of the CLI with an error budget."""
+        import tempfile
+        from pathlib import Path
+
+        from .synthetic import generate_workbook
+        from metadata_validator.specs import DNAseqSpec
+
+        runner = CliRunner()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            spec = DNAseqSpec()
+            valid = generate_workbook(spec, Path(tmpdir) / 'valid.xlsx', 5)
+            invalid = generate_workbook(
+                spec, Path(tmpdir) / 'invalid.xlsx', 5, invalid_rate=0.5
+            )
+            for filepath, exit_code in [(valid, 0), (invalid, 1)]:
+                output = Path(tmpdir) / f'{filepath.stem}.log'
+                result = runner.invoke(cli.cli, [
+                    'validate', '-i', str(filepath), '-o', str(output),
+                    '-t', 'DNAseq', '--fail-fast', '--no-cache',
+                ])
+                assert result.exit_code == exit_code, result.output
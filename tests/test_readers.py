@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+"""Tests for `metadata_validator.readers` module."""
+
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from metadata_validator.dtypes import spec_dtypes
+from metadata_validator.readers import HAS_PYARROW, detect_format, get_reader
+from metadata_validator.specs import DNAseqSpec, RNAseqSpec
+from metadata_validator.validator import DNAseqMetadataValidator, RNAseqMetadataValidator
+
+from .utils import example_rows, write_workbook
+
+
+class TestReaders(unittest.TestCase):
+    """Tests for the reader backends."""
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.spec = DNAseqSpec()
+        self.frames = {}
+        for sheet_name in self.spec.sheet_names:
+            rows = example_rows(self.spec, sheet_name, n=5)
+            self.frames[sheet_name] = pd.DataFrame(rows[1:], columns=rows[0])
+        self.frames["quality_control"].loc[3, "q30"] = 101
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_tables(self, extension, writer):
+        directory = self.tmpdir / extension
+        directory.mkdir()
+        for sheet_name, frame in self.frames.items():
+            writer(frame, directory / f"{sheet_name}.{extension}")
+        return directory
+
+    def assert_validates(self, path):
+        for chunk_size in [None, 2]:
+            validator = DNAseqMetadataValidator(path, chunk_size=chunk_size)
+            self.assertEqual(validator.sheet_names, self.spec.sheet_names)
+            validator.validate()
+            self.assertIn(
+                "Error: q30 has values greater than 100 (rows: 5)", validator.errors
+            )
+            self.assertNotIn("Error: Column", validator.errors)
+
+    def test_csv_directory(self):
+        directory = self.write_tables("csv", lambda df, p: df.to_csv(p, index=False))
+        self.assertEqual(detect_format(directory), "csv")
+        self.assert_validates(directory)
+
+    def test_tsv_directory(self):
+        directory = self.write_tables(
+            "tsv", lambda df, p: df.to_csv(p, sep="\t", index=False)
+        )
+        self.assert_validates(directory)
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_parquet_directory(self):
+        directory = self.write_tables(
+            "parquet", lambda df, p: df.to_parquet(p, index=False)
+        )
+        self.assert_validates(directory)
+
+        reader = get_reader(directory, self.spec.sheet_names)
+        frame = reader.read("metadata", columns=["library_id", "not_a_column"])
+        self.assertEqual(list(frame.columns), ["library_id"])
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_arrow_directory(self):
+        directory = self.write_tables(
+            "arrow", lambda df, p: df.to_feather(p)
+        )
+        self.assert_validates(directory)
+
+    def test_single_file(self):
+        path = self.tmpdir / "submission.quality_control.csv"
+        self.frames["quality_control"].to_csv(path, index=False)
+        reader = get_reader(path, self.spec.sheet_names)
+        self.assertEqual(reader.sheet_names, ["quality_control"])
+
+        path = self.tmpdir / "submission.csv"
+        self.frames["metadata"].to_csv(path, index=False)
+        reader = get_reader(path, self.spec.sheet_names)
+        self.assertEqual(reader.sheet_names, ["metadata"])
+
+        validator = DNAseqMetadataValidator(path)
+        self.assertIn("sheet named 'quality_control' not found", validator.errors)
+
+    def test_dtypes(self):
+        rows = example_rows(self.spec, "metadata", n=4)
+        header = rows[0]
+        # A number typed as text, an id which looks like a number and a null
+        rows[2][header.index("file_size")] = "big"
+        rows[3][header.index("library_id")] = 123
+        rows[4][header.index("preparation_pcr_cycles")] = None
+        path = write_workbook(self.tmpdir / "dnaseq.xlsx", {"metadata": rows})
+        self.frames["metadata"] = pd.DataFrame(rows[1:], columns=header)
+        directory = self.write_tables("csv", lambda df, p: df.to_csv(p, index=False))
+        dtypes = spec_dtypes(self.spec.plan.sheets["metadata"])
+
+        for source in [path, directory]:
+            reader = get_reader(source, ["metadata"])
+            frames = [reader.read("metadata", dtypes=dtypes)]
+            frames.append(pd.concat(reader.iter_chunks("metadata", 3, dtypes=dtypes)))
+            for frame in frames:
+                self.assertIsInstance(frame["library_id"].dtype, pd.StringDtype)
+                self.assertEqual(frame["library_id"][2], "123")
+                self.assertIsInstance(frame["sample_id"].dtype, pd.CategoricalDtype)
+                self.assertEqual(str(frame["preparation_pcr_cycles"].dtype), "Int64")
+                self.assertTrue(pd.isna(frame["preparation_pcr_cycles"][3]))
+                # A cell which isn't a number keeps the column as it was read
+                self.assertEqual(frame["file_size"].tolist()[1], "big")
+            reader.close()
+
+        validator = DNAseqMetadataValidator(path)
+        validator.validate()
+        issues = [issue for issue in validator.iter_issues() if issue.rule == "number"]
+        self.assertEqual([(issue.row, issue.value) for issue in issues], [(3, "big")])
+
+    def test_boolean_dtype(self):
+        spec = RNAseqSpec()
+        rows = example_rows(spec, "metadata", n=3)
+        column = rows[0].index("is_paired_end")
+        rows[1][column], rows[2][column], rows[3][column] = "Yes", False, "0"
+        path = write_workbook(self.tmpdir / "rnaseq.xlsx", {"metadata": rows})
+
+        validator = RNAseqMetadataValidator(path)
+        frame = validator.metadata["metadata"]
+        self.assertEqual(str(frame["is_paired_end"].dtype), "boolean")
+        self.assertEqual(frame["is_paired_end"].tolist(), [True, False, False])
+
+    def test_unknown_format(self):
+        path = self.tmpdir / "submission.json"
+        path.write_text("{}")
+        with self.assertRaises(ValueError):
+            detect_format(path)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+"""Tests for `metadata_validator.report` module."""
+
+
+import io
+import json
+import unittest
+
+import numpy as np
+
+from metadata_validator.report import (
+    ERROR,
+    Issue,
+    format_rows,
+    iter_text_lines,
+    to_builtin,
+    write_json,
+    write_jsonl,
+)
+
+
+class TestReport(unittest.TestCase):
+    """Tests for the structured issues and the reports."""
+
+    def setUp(self):
+        msg = "q30 has values greater than 100"
+        self.issues = [
+            Issue(ERROR, "quality_control", None, None, "missing", None, "Missing columns: ['rin']"),
+            Issue(ERROR, "quality_control", "q30", 3, "max", 101, msg),
+            Issue(ERROR, "quality_control", "q30", 5, "max", 120.5, msg),
+        ]
+
+    def test_format_rows(self):
+        self.assertEqual(format_rows([3, 5], 2), "3, 5")
+        self.assertEqual(format_rows([3], 2), "3, ... (2 in total)")
+
+    def test_to_builtin(self):
+        self.assertIsInstance(to_builtin(np.int64(3)), int)
+        self.assertEqual(to_builtin("D5"), "D5")
+
+    def test_text(self):
+        lines = list(iter_text_lines(self.issues, "Error"))
+        self.assertEqual(
+            lines,
+            [
+                "Error: Missing columns: ['rin']\n",
+                "Error: q30 has values greater than 100 (rows: 3, 5)\n",
+            ],
+        )
+
+    def test_suggestions(self):
+        msg = "sample_id has values not in ['D5', 'D6']"
+        issues = [
+            Issue(ERROR, "metadata", "sample_id", 2, "options", "d5", msg, "D5"),
+            Issue(ERROR, "metadata", "sample_id", 3, "options", "d5", msg, "D5"),
+            Issue(ERROR, "metadata", "sample_id", 4, "options", "xyz", msg),
+        ]
+        self.assertEqual(
+            list(iter_text_lines(issues, "Error")),
+            [f"Error: {msg} (rows: 2, 3, 4, did you mean: d5 -> D5)\n"],
+        )
+
+    def test_json(self):
+        fp = io.StringIO()
+        write_json(iter(self.issues), fp)
+        records = json.loads(fp.getvalue())
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[1]["row"], 3)
+        self.assertEqual(records[1]["value"], 101)
+        self.assertEqual(records[1]["severity"], "error")
+
+        fp = io.StringIO()
+        write_json(iter([]), fp)
+        self.assertEqual(json.loads(fp.getvalue()), [])
+
+    def test_jsonl(self):
+        fp = io.StringIO()
+        write_jsonl(self.issues, fp)
+        records = [json.loads(line) for line in fp.getvalue().splitlines()]
+        self.assertEqual([record["rule"] for record in records], ["missing", "max", "max"])
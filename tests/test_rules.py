@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+"""Tests for `metadata_validator.rules` module."""
+
+
+import re
+import datetime
+import unittest
+
+import pandas as pd
+
+from metadata_validator.booleans import parse_booleans
+from metadata_validator.dates import parse_dates
+from metadata_validator.rules import column_violations
+from metadata_validator.specs.spec import ExpectedColumnItem, Type
+
+
+def violations(column_spec, values):
+    return {
+        rule_id: mask.tolist()
+        for rule_id, _, mask in column_violations(column_spec, pd.Series(values))
+    }
+
+
+class TestRules(unittest.TestCase):
+    """Tests for the vectorized column rules."""
+
+    def test_regex(self):
+        column_spec = ExpectedColumnItem(
+            name="md5sum",
+            procedure="Basic Info",
+            type=Type.TEXT,
+            regex=re.compile(r"^[a-f0-9]{32}$"),
+        )
+        result = violations(column_spec, ["a" * 32, "xyz", 12])
+        self.assertEqual(result, {"regex": [False, True, True]})
+
+    def test_range(self):
+        column_spec = ExpectedColumnItem(
+            name="q30", procedure="Sequencing QC", type=Type.NUMBER, min=0, max=100
+        )
+        result = violations(column_spec, [0, -1, 101, "abc", 50.5])
+        self.assertEqual(result["number"], [False, False, False, True, False])
+        self.assertEqual(result["min"], [False, True, False, False, False])
+        self.assertEqual(result["max"], [False, False, True, False, False])
+
+    def test_options(self):
+        column_spec = ExpectedColumnItem(
+            name="sample_id",
+            procedure="Basic Info",
+            type=Type.CATEGORY,
+            options=["D5", "D6"],
+        )
+        result = violations(column_spec, ["D5", "d5", "D6"])
+        self.assertEqual(result, {"options": [False, True, False]})
+
+        # Categorical values are checked once per category
+        values = pd.Series(["D6", "x", "D5", "x"], dtype="category", index=[4, 5, 6, 7])
+        ((_, _, mask),) = column_violations(column_spec, values)
+        self.assertEqual(mask.tolist(), [False, True, False, True])
+        self.assertEqual(mask.index.tolist(), [4, 5, 6, 7])
+
+    def test_date(self):
+        column_spec = ExpectedColumnItem(
+            name="run_date",
+            procedure="Sequencing Info",
+            type=Type.DATE,
+            min=20150101,
+            max=20361231,
+        )
+        values = [
+            20210523,
+            "20201332",
+            "2021-05-23",
+            "2021-02-29",
+            datetime.datetime(2021, 5, 23, 10, 30),
+            44339,
+            20140101,
+            "2037-01-01",
+            "not a date",
+        ]
+        result = violations(column_spec, values)
+        self.assertEqual(
+            result["date"], [False, True, False, True, False, False, False, False, True]
+        )
+        self.assertEqual(
+            result["min"], [False, False, False, False, False, False, True, False, False]
+        )
+        self.assertEqual(
+            result["max"], [False, False, False, False, False, False, False, True, False]
+        )
+
+        dates = parse_dates(pd.Series([20210523, 20210230, 44339.5]))
+        self.assertEqual(
+            dates.tolist(), [datetime.date(2021, 5, 23), None, datetime.date(2021, 5, 23)]
+        )
+        # Partial dates and truncated YYYYMMDD are not dates
+        values = pd.Series(["2021-05-23", "2021-05", "202105", 2021, "44339"], dtype=object)
+        self.assertEqual(
+            parse_dates(values).tolist(),
+            [datetime.date(2021, 5, 23), None, None, None, datetime.date(2021, 5, 23)],
+        )
+
+    def test_boolean(self):
+        column_spec = ExpectedColumnItem(
+            name="is_paired_end", procedure="Library Sequencing", type=Type.BOOLEAN
+        )
+        values = ["TRUE", "false", "Yes", "n", 1, 0.0, True, "maybe", 2]
+        result = violations(column_spec, values)
+        self.assertEqual(result, {"boolean": [False] * 7 + [True, True]})
+
+        booleans, valid = parse_booleans(pd.Series(values[:7] + [None]))
+        self.assertEqual(
+            booleans.tolist(), [True, False, True, False, True, False, True, False]
+        )
+        self.assertTrue(valid.all())
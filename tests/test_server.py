@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+"""Tests for `metadata_validator.server` module."""
+
+
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from metadata_validator.server import ServiceError, ValidationService, make_server
+from metadata_validator.specs import DNAseqSpec
+
+from .synthetic import generate_workbook
+
+
+class TestServer(unittest.TestCase):
+    """Tests for the validation service."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = Path(tempfile.mkdtemp())
+        cls.valid = generate_workbook(DNAseqSpec(), cls.tmpdir / "valid.xlsx", 5)
+        cls.invalid = generate_workbook(
+            DNAseqSpec(), cls.tmpdir / "invalid.xlsx", 5, invalid_rate=0.5
+        )
+
+        cls.service = ValidationService(workers=1, concurrency=2, roots=[cls.tmpdir])
+        cls.service.start()
+        cls.server = make_server(cls.service, port=0, quiet=True)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.service.close()
+        shutil.rmtree(cls.tmpdir)
+
+    def request(self, path, data=None):
+        request = urllib.request.Request(self.url + path, data=data, method="POST")
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_socket_path(self):
+        # An existing file which is not a socket is never removed
+        filepath = self.tmpdir / "not_a_socket"
+        filepath.write_text("data")
+        with self.assertRaises(FileExistsError):
+            make_server(self.service, socket_path=str(filepath), quiet=True)
+        self.assertEqual(filepath.read_text(), "data")
+
+        # The socket of a previous run is replaced
+        socket_path = str(self.tmpdir / "metav.sock")
+        for _ in range(2):
+            make_server(self.service, socket_path=socket_path, quiet=True).server_close()
+
+    def test_health(self):
+        with urllib.request.urlopen(self.url + "/health") as response:
+            health = json.loads(response.read())
+        self.assertEqual(health["status"], "ok")
+        self.assertIn("DNAseq", health["template_types"])
+        self.assertEqual(health["free_slots"], 2)
+
+    def test_upload(self):
+        status, result = self.request(
+            "/validate?template_type=DNAseq&filename=valid.xlsx",
+            self.valid.read_bytes(),
+        )
+        self.assertEqual(status, 200)
+        self.assertTrue(result["valid"])
+        self.assertEqual(result["file"], "valid.xlsx")
+
+        status, result = self.request(
+            "/validate?template_type=DNAseq&fail_fast=1", self.invalid.read_bytes()
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(result["errors"], 1)
+        self.assertTrue(result["stopped_early"])
+
+    def test_path(self):
+        status, result = self.request(
+            f"/validate?template_type=DNAseq&path={self.invalid}"
+        )
+        self.assertEqual(status, 200)
+        self.assertFalse(result["valid"])
+        self.assertEqual(
+            result["errors"],
+            sum(1 for issue in result["issues"] if issue["severity"] == "error"),
+        )
+
+        status, result = self.request("/validate?template_type=DNAseq&path=/etc/passwd")
+        self.assertEqual(status, 403)
+
+    def test_bad_requests(self):
+        status, _ = self.request("/validate?template_type=Proteomics", b"x")
+        self.assertEqual(status, 400)
+        status, _ = self.request("/validate", b"x")
+        self.assertEqual(status, 400)
+        status, _ = self.request("/other", b"x")
+        self.assertEqual(status, 404)
+
+    def test_concurrency_limit(self):
+        service = ValidationService(workers=1, concurrency=1)
+        service._executor = object()
+        service._slots.acquire()
+        with self.assertRaises(ServiceError) as context:
+            service.validate(self.valid, "DNAseq")
+        self.assertEqual(context.exception.status, 503)
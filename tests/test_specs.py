@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+"""Tests for `metadata_validator.specs` package."""
+
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from metadata_validator.specs import spec_dict, DNAseqSpec, RNAseqSpec
+from metadata_validator.specs.spec import OptionIndex
+
+
+class TestValidationPlan(unittest.TestCase):
+    """Tests for `BaseSpec.plan`."""
+
+    def test_plan_is_cached(self):
+        self.assertIs(RNAseqSpec().plan, RNAseqSpec().plan)
+
+    def test_plan_matches_specs(self):
+        for spec_class in spec_dict.values():
+            spec = spec_class()
+            plan = spec.plan
+            self.assertEqual(plan.version, spec.version)
+            self.assertEqual(plan.sheet_names, list(spec.specs.keys()))
+            for sheet, items in spec.specs.items():
+                self.assertEqual(
+                    [column.name for column in plan.sheets[sheet]],
+                    [item.name for item in items],
+                )
+
+    def test_plan_is_immutable(self):
+        plan = RNAseqSpec().plan
+        column = plan.sheets["metadata"][0]
+        with self.assertRaises(AttributeError):
+            column.name = "other"
+        with self.assertRaises(AttributeError):
+            plan.version = "other"
+        with self.assertRaises(TypeError):
+            plan.sheets["other"] = ()
+
+    def test_option_index(self):
+        (column,) = [
+            column
+            for column in DNAseqSpec().plan.sheets["metadata"]
+            if column.name == "sample_id"
+        ]
+        self.assertIn("D5_1", column.option_index)
+        self.assertEqual(column.option_index.suggest("d5 1"), "D5_1")
+        # D5_1, D5_2 and D5_3 are as close to d5 as each other
+        self.assertIsNone(column.option_index.suggest("d5"))
+        self.assertEqual(column.option_index.suggest("M8-3"), "M8_3")
+        self.assertIsNone(column.option_index.suggest("unknown"))
+
+        index = OptionIndex(["FASTQ", "CSV", "positive"])
+        self.assertEqual(index.suggest("fastq"), "FASTQ")
+        self.assertEqual(index.suggest("FASTA"), "FASTQ")
+        self.assertEqual(index.suggest("postive"), "positive")
+        self.assertIsNone(index.suggest(""))
+
+
+class TestGenerateTemplate(unittest.TestCase):
+    """Tests for `BaseSpec.generate_template`."""
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_generate_template(self):
+        for name, spec_class in spec_dict.items():
+            spec = spec_class()
+            filepath = self.tmpdir / f"{name}.xlsx"
+            spec.generate_template(filepath)
+
+            wb = load_workbook(filepath)
+            self.assertEqual(wb.sheetnames, ["Please Read First!"] + spec.sheet_names)
+            for sheet, items in spec.specs.items():
+                header = [cell.value for cell in wb[sheet][1]]
+                self.assertEqual(header, [item.name for item in items])
+
+    def test_template_styles(self):
+        spec = RNAseqSpec()
+        filepath = self.tmpdir / "rnaseq.xlsx"
+        spec.generate_template(filepath)
+
+        ws = load_workbook(filepath)["Please Read First!"]
+        self.assertIn("A1:F1", [str(cells) for cells in ws.merged_cells.ranges])
+        self.assertEqual(ws["A1"].value, f"Please Read First ({spec.version})")
+        self.assertTrue(ws["A1"].font.b)
+
+        rows = list(ws.iter_rows(values_only=True))
+        first = rows.index(tuple(["key", "description", "procedure", "type", "required", "example"]))
+        cell = ws.cell(row=first + 2, column=1)
+        self.assertEqual(cell.value, spec.specs["metadata"][0].name)
+        self.assertEqual(cell.style, f"metav_fill_{spec.plan.colors['metadata'][0]}")
+        self.assertEqual(cell.border.top.style, "thin")
@@ -0,0 +1,16 @@
+#!/usr/bin/env python
+
+"""Tests for the startup of the `metav` command line."""
+
+
+import unittest
+
+from .startup import COMMANDS, forbidden_imports
+
+
+class TestStartup(unittest.TestCase):
+    """The commands which don't read a metadata file must not import pandas."""
+
+    def test_lazy_imports(self):
+        for command in COMMANDS:
+            self.assertEqual(forbidden_imports(command), [], command)
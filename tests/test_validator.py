@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+
+"""Tests for `metadata_validator.validator` module."""
+
+
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from metadata_validator.cache import ResultCache
+from metadata_validator.profiling import Profiler
+from metadata_validator.specs import DNAseqSpec, RNAseqSpec, MetabolomicsSpec
+from metadata_validator.validator import (
+    DNAseqMetadataValidator,
+    RNAseqMetadataValidator,
+    MetabolomicsMetadataValidator,
+)
+
+from .synthetic import generate_workbook
+
+from .utils import write_workbook, example_rows
+
+
+class TestMetadataValidator(unittest.TestCase):
+    """Tests for `MetadataValidator`."""
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.spec = DNAseqSpec()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_read_all_sheets(self):
+        filepath = write_workbook(
+            self.tmpdir / "dnaseq.xlsx",
+            {
+                sheet_name: example_rows(self.spec, sheet_name)
+                for sheet_name in self.spec.sheet_names
+            },
+        )
+        validator = DNAseqMetadataValidator(filepath)
+        self.assertEqual(validator.sheet_names, self.spec.sheet_names)
+        self.assertEqual(len(validator.metadata["metadata"]), 3)
+        self.assertEqual(len(validator.metadata["quality_control"]), 3)
+
+    def test_missing_sheet(self):
+        filepath = write_workbook(
+            self.tmpdir / "dnaseq.xlsx",
+            {"metadata": example_rows(self.spec, "metadata")},
+        )
+        validator = DNAseqMetadataValidator(filepath)
+        self.assertEqual(validator.sheet_names, ["metadata"])
+        self.assertIn("Reading excel file quality_control", validator.errors)
+
+    def test_validate_columns(self):
+        rows = example_rows(self.spec, "quality_control")
+        q30 = rows[0].index("q30")
+        rows[2][q30] = 101
+        filepath = write_workbook(
+            self.tmpdir / "dnaseq.xlsx",
+            {
+                "metadata": example_rows(self.spec, "metadata"),
+                "quality_control": rows,
+            },
+        )
+        validator = DNAseqMetadataValidator(filepath)
+        validator.validate()
+        self.assertIn(
+            "Check Sheet metadata with errors:\nNo errors found.", validator.errors
+        )
+        self.assertIn(
+            "Error: q30 has values greater than 100 (rows: 3)", validator.errors
+        )
+
+    def test_streaming(self):
+        rows = example_rows(self.spec, "quality_control", n=7)
+        header = rows[0]
+        rows[3][header.index("q30")] = 101
+        rows[6][header.index("q30")] = -1
+        rows[5][header.index("dna_conc")] = None
+        filepath = write_workbook(
+            self.tmpdir / "dnaseq.xlsx",
+            {
+                "metadata": example_rows(self.spec, "metadata"),
+                "quality_control": rows,
+            },
+        )
+        expected = DNAseqMetadataValidator(filepath)
+        expected.validate()
+
+        for chunk_size in [1, 2, 100]:
+            validator = DNAseqMetadataValidator(filepath, chunk_size=chunk_size)
+            validator.validate()
+            self.assertEqual(validator.metadata, {})
+            self.assertEqual(validator.errors, expected.errors)
+            self.assertEqual(validator.warnings, expected.warnings)
+
+        self.assertIn("Error: q30 has values greater than 100 (rows: 4)", expected.errors)
+        self.assertIn("Error: q30 has values less than 0 (rows: 7)", expected.errors)
+        self.assertIn("Column dna_conc has null values.", expected.warnings)
+
+    def test_validate_rows(self):
+        spec = RNAseqSpec()
+        metadata = example_rows(spec, "metadata", n=4)
+        quality_control = example_rows(spec, "quality_control", n=3)
+        file_name = metadata[0].index("file_name")
+        library_id = metadata[0].index("library_id")
+        for i, row in enumerate(metadata[1:]):
+            row[file_name] = f"file_{i}.fastq.gz"
+            row[library_id] = f"library_{i}"
+        metadata[4][file_name] = "file_0.fastq.gz"
+        for i, row in enumerate(quality_control[1:]):
+            row[quality_control[0].index("library_id")] = f"library_{i + 1}"
+        quality_control[3][quality_control[0].index("library_id")] = "library_1"
+
+        filepath = write_workbook(
+            self.tmpdir / "rnaseq.xlsx",
+            {"metadata": metadata, "quality_control": quality_control},
+        )
+        for chunk_size in [None, 2]:
+            validator = RNAseqMetadataValidator(filepath, chunk_size=chunk_size)
+            validator.validate()
+            errors = validator.errors
+            self.assertIn(
+                "Column file_name has duplicated value file_0.fastq.gz (rows: 2, 5)",
+                errors,
+            )
+            self.assertIn(
+                "Column library_id value library_0 not found in sheet quality_control (rows: 2)",
+                errors,
+            )
+            self.assertIn(
+                "Column library_id has duplicated value library_1 (rows: 2, 4)",
+                errors,
+            )
+            self.assertNotIn("not found in sheet metadata", errors)
+
+    def test_structured_issues(self):
+        rows = example_rows(self.spec, "quality_control")
+        rows[2][rows[0].index("q30")] = 101
+        dna_conc = rows[0].index("dna_conc")
+        for row in rows:
+            del row[dna_conc]
+        metadata = example_rows(self.spec, "metadata")
+        metadata[3][metadata[0].index("sample_id")] = "d5-2"
+        filepath = write_workbook(
+            self.tmpdir / "dnaseq.xlsx",
+            {"metadata": metadata, "quality_control": rows},
+        )
+        validator = DNAseqMetadataValidator(filepath)
+        validator.validate()
+
+        issues = [issue for issue in validator.iter_issues() if issue.rule == "options"]
+        self.assertEqual([(issue.row, issue.suggestion) for issue in issues], [(4, "D5_2")])
+        self.assertIn("did you mean: d5-2 -> D5_2", validator.errors)
+
+        issues = [issue for issue in validator.iter_issues() if issue.rule == "max"]
+        self.assertEqual(len(issues), 1)
+        self.assertEqual(
+            issues[0][:6], ("error", "quality_control", "q30", 3, "max", 101)
+        )
+
+        fp = io.StringIO()
+        validator.write_report(fp, format="jsonl")
+        records = [json.loads(line) for line in fp.getvalue().splitlines()]
+        self.assertEqual(records, [issue._asdict() for issue in validator.iter_issues()])
+
+        fp = io.StringIO()
+        validator.write_report(fp, format="text")
+        self.assertEqual(fp.getvalue(), validator.errors + "\n" + validator.warnings)
+
+    def test_synthetic_workbooks(self):
+        for spec_class, validator_class in [
+            (DNAseqSpec, DNAseqMetadataValidator),
+            (RNAseqSpec, RNAseqMetadataValidator),
+            (MetabolomicsSpec, MetabolomicsMetadataValidator),
+        ]:
+            filepath = generate_workbook(spec_class(), self.tmpdir / "valid.xlsx", 20)
+            validator = validator_class(filepath)
+            validator.validate()
+            self.assertEqual(list(validator.iter_issues()), [])
+
+            filepath = generate_workbook(
+                spec_class(), self.tmpdir / "invalid.xlsx", 20, invalid_rate=0.5
+            )
+            validator = validator_class(filepath)
+            validator.validate()
+            self.assertNotEqual(list(validator.iter_issues()), [])
+
+    def test_result_cache(self):
+        rows = example_rows(self.spec, "quality_control")
+        rows[2][rows[0].index("q30")] = 101
+        filepath = write_workbook(
+            self.tmpdir / "dnaseq.xlsx",
+            {"metadata": example_rows(self.spec, "metadata"), "quality_control": rows},
+        )
+        cache = ResultCache(self.tmpdir / "cache")
+
+        validator = DNAseqMetadataValidator(filepath, cache=cache)
+        self.assertFalse(validator.cached)
+        validator.validate()
+
+        cached = DNAseqMetadataValidator(filepath, cache=cache)
+        self.assertTrue(cached.cached)
+        cached.validate()
+        self.assertEqual(cached.errors, validator.errors)
+        self.assertEqual(cached.warnings, validator.warnings)
+
+        # The same file validated with other specs is a cache miss
+        other = RNAseqMetadataValidator(filepath, cache=cache)
+        self.assertFalse(other.cached)
+
+        # So is the same file after a change of the rules of the validator
+        with mock.patch("metadata_validator.cache.RESULTS_VERSION", -1):
+            self.assertFalse(DNAseqMetadataValidator(filepath, cache=cache).cached)
+
+    def test_result_cache_eviction(self):
+        cache = ResultCache(self.tmpdir / "cache", max_size=100)
+        cache.set("a", {"errors": {}, "padding": "x" * 60})
+        cache.set("b", {"errors": {}, "padding": "x" * 60})
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("b"))
+
+    def test_error_budgets(self):
+        filepath = generate_workbook(
+            self.spec, self.tmpdir / "invalid.xlsx", 50, invalid_rate=0.5
+        )
+        full = DNAseqMetadataValidator(filepath)
+        full.validate()
+        errors = [issue for issue in full.iter_issues() if issue.severity == "error"]
+        self.assertGreater(len(errors), 5)
+        self.assertFalse(full.stopped_early)
+
+        for chunk_size in [None, 7]:
+            validator = DNAseqMetadataValidator(
+                filepath, chunk_size=chunk_size, fail_fast=True
+            )
+            validator.validate()
+            issues = list(validator.iter_issues())
+            self.assertTrue(validator.stopped_early)
+            self.assertEqual(issues[0], errors[0])
+            self.assertEqual([issue.severity for issue in issues].count("error"), 1)
+            self.assertIn("stopped", [issue.rule for issue in issues])
+
+        validator = DNAseqMetadataValidator(filepath, max_sheet_errors=2)
+        validator.validate()
+        for sheet_name in self.spec.sheet_names:
+            sheet_errors = [
+                issue
+                for issue in validator.iter_issues()
+                if issue.severity == "error" and issue.sheet == sheet_name
+            ]
+            self.assertEqual(len(sheet_errors), 2)
+
+    def test_column_workers(self):
+        filepath = generate_workbook(
+            RNAseqSpec(), self.tmpdir / "invalid.xlsx", 40, invalid_rate=0.2, seed=5
+        )
+
+        def report(**kwargs):
+            validator = RNAseqMetadataValidator(filepath, **kwargs)
+            validator.validate()
+            fp = io.StringIO()
+            validator.write_report(fp, format="json")
+            return fp.getvalue()
+
+        for kwargs in [{}, {"chunk_size": 7}, {"max_errors": 10}, {"profiler": Profiler()}]:
+            expected = report(**kwargs)
+            self.assertIn('"rule": "options"', expected)
+            for workers in [2, 4]:
+                self.assertEqual(report(column_workers=workers, **kwargs), expected, kwargs)
+
+        with self.assertRaises(ValueError):
+            RNAseqMetadataValidator(filepath, column_workers=0)
+
+    def test_profiling(self):
+        filepath = generate_workbook(
+            self.spec, self.tmpdir / "invalid.xlsx", 30, invalid_rate=0.2, seed=2
+        )
+        expected = DNAseqMetadataValidator(filepath)
+        expected.validate()
+
+        for chunk_size in [None, 7]:
+            profiler = Profiler()
+            validator = DNAseqMetadataValidator(
+                filepath, chunk_size=chunk_size, profiler=profiler
+            )
+            validator.validate()
+            self.assertEqual(list(validator.iter_issues()), list(expected.iter_issues()))
+
+            self.assertEqual(profiler.stats[("read", "metadata")].rows % 30, 0)
+            for rule in ["regex", "number", "min", "max", "options", "unique", "link"]:
+                violations = sum(
+                    stat.violations
+                    for path, stat in profiler.stats.items()
+                    if path[0] in ("columns", "rows") and path[-1] == rule
+                )
+                reported = sum(1 for issue in expected.iter_issues() if issue.rule == rule)
+                self.assertEqual(violations, reported, rule)
+
+            # The own time of the paths adds up to the time of the stages
+            own = profiler.self_seconds()
+            column = ("columns", "metadata", "library_id")
+            children = sum(
+                stat.seconds
+                for path, stat in profiler.stats.items()
+                if path[:-1] == column
+            )
+            self.assertAlmostEqual(
+                own[column], profiler.stats[column].seconds - children
+            )
+
+            collapsed = io.StringIO()
+            profiler.write_collapsed(collapsed)
+            for line in collapsed.getvalue().splitlines():
+                frames, count = line.rsplit(" ", 1)
+                self.assertIn(tuple(frames.split(";")), profiler.stats)
+                self.assertGreater(int(count), 0)
+
+            table = io.StringIO()
+            profiler.write_table(table, limit=5)
+            self.assertEqual(len(table.getvalue().splitlines()), 6)
@@ -0,0 +1,22 @@
+"""Helpers shared by the tests."""
+
+from openpyxl import Workbook
+
+
+def write_workbook(filepath, sheets):
+    """Write a workbook, sheets is a dict of sheet name -> list of rows."""
+    wb = Workbook()
+    wb.remove(wb.active)
+    for sheet_name, rows in sheets.items():
+        ws = wb.create_sheet(sheet_name)
+        for row in rows:
+            ws.append(row)
+    wb.save(filepath)
+    return filepath
+
+
+def example_rows(spec, sheet_name, n=3):
+    items = spec.specs[sheet_name]
+    return [[item.name for item in items]] + [
+        [item.example for item in items] for _ in range(n)
+    ]